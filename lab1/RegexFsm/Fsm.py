@@ -1,92 +1,51 @@
-import uuid
-from uuid import UUID
-
-from typing import List, Type, Generic, TypeVar
-
-from RegexFsm.tokenizer import Tokenizer
+import time
+from collections import deque
+from itertools import count
+
+from RegexFsm.parser import parse, Char, Class, Group, Repeat, Node
+from RegexFsm.charset import CharSet, ClassMap, label_key
+from RegexFsm.closure import remove_epsilons
+from RegexFsm.table import FsmTable, START
+from RegexFsm.minimize import hopcroft
+from RegexFsm.lazy import MAX_STATES, LazyDfa
+from RegexFsm.codegen import CodegenMatcher
+from RegexFsm.counters import CountingMatcher, CountingPrefilter
+from RegexFsm.literals import Prefilter
+from RegexFsm import batch, pool
+from RegexFsm.search import Scanner, Match
 
 
 class FsmNode:
 
+    #  Сквозная нумерация узлов; в множествах и словарях узлы сравниваются
+    #  по identity, id нужен для таблиц и отладочного вывода
+    ids = count()
+
     def __init__(self, exitable=False) -> None:
 
-        self.id = uuid.uuid4()
+        self.id = next(FsmNode.ids)
 
-        ## {by: [to, ...]}
+        ## {by: {to, ...}}, by - символ, CharSet или None (e-дуга)
         self.transitions: dict[
-            str,
-            list["FsmNode"]
+            str | CharSet | None,
+            set["FsmNode"]
         ] = dict()
 
         self.exitable: bool = exitable
 
     def __repr__(self):
-        return str(self.id)[:5]
-
-    def get_data_for_repr(self):
-        result = []
-
-        for by_ in self.transitions:
-            for node in self.transitions[by_]:
-                result.append(
-                    (
-                        self.id,
-                        node.id,
-                        by_ if by_ is not None else "None",
-                        ("", "*")[self.exitable]
-                    )
-                )
-
-        if not result:
-             result.append((self.id, "", "None", ("", "*")[self.exitable]))
-
-        return result
-
-    def __eq__(self, other: "FsmNode"):
-        return self.id == other.id
-
-    def target(self, other: "FsmNode", by_: str|None = None) -> tuple[int, int]:
-        arr = self.transitions.get(by_, [])
-
-        if other.id not in [node.id for node in arr]:
-            self.transitions[by_] = arr + [other]
+        return str(self.id)
 
-    def forget(self, by_, uuid_:UUID):
+    def target(self, other: "FsmNode", by_: str | CharSet | None = None) -> None:
+        targets = self.transitions.get(by_)
 
-        self.transitions[by_].pop(
-            next(
-                filter(
-                    lambda pair: pair[1].id == uuid_,
-                    enumerate(self.transitions[by_])
-                )
-            )[0]
-        )
-
-    def del_e_edges(self):
-
-        to_forget = []
-
-        for targeted_node in self.transitions.get(None, []):
-
-            to_forget.append(targeted_node.id)
-            if targeted_node.exitable:
-                self.exitable = True
-
-            for by_ in targeted_node.transitions:
-                for to_target_node in targeted_node.transitions[by_]:
-                    self.target(to_target_node, by_)
-
-        for forget in to_forget:
-            self.forget(None, forget)
-
-        if self.transitions.get(None, []):
-            self.del_e_edges()
-
-    def __hash__(self):
-        return hash(self.id)
+        if targets is None:
+            self.transitions[by_] = {other}
+        else:
+            targets.add(other)
 
 
-def zero_or_one(S: FsmNode, by_: str) -> None:
+def zero_or_one(S: FsmNode, by_: str | CharSet | Group) -> None:
     """
         n?
     """
@@ -94,55 +53,48 @@ def zero_or_one(S: FsmNode, by_: str) -> None:
     Z  = FsmNode()
     S.target(Z, by_=None)
 
-    if isinstance(by_, str):
+    if not isinstance(by_, Group):
         S.target(Z, by_=by_)
 
     else:
-        fA = Fsm(by_)
-        fa_ending_nodes = fA.get_ending_nodes()
-        S.target(fA.head)
-
-        for f_ending in fa_ending_nodes:
-            f_ending.target(Z)
-            f_ending.exitable = False
+        A, B = make_nfa(by_)
+        S.target(A)
+        B.target(Z)
 
     return Z
 
 
-def zero_or_more(S: FsmNode, by_: str) -> None:
+def zero_or_more(S: FsmNode, by_: str | CharSet | Group) -> None:
     """
         n*
     """
 
     Z = FsmNode()
-    if isinstance(by_, str):
+    if not isinstance(by_, Group):
         A = FsmNode()
         S.target(A, by_=None)
         A.target(Z, by_=None)
         A.target(A, by_=by_)
 
     else:
-        fA = Fsm(by_)
-        fa_ending_nodes = fA.get_ending_nodes()
+        A, B = make_nfa(by_)
 
-        S.target(fA.head)
+        S.target(A)
         S.target(Z)
 
-        for f_ending in fa_ending_nodes:
-            f_ending.target(fA.head)
-            f_ending.target(Z)    
-            f_ending.exitable = False
+        B.target(A)
+        B.target(Z)
 
     return Z
 
 
-def one_or_more(S: FsmNode, by_: str) -> None:
+def one_or_more(S: FsmNode, by_: str | CharSet | Group) -> None:
     """
         n+
     """
 
     Z = FsmNode()
-    if isinstance(by_, str):
+    if not isinstance(by_, Group):
         A = FsmNode()
 
         S.target(A, by_=by_)
@@ -150,290 +102,482 @@ def one_or_more(S: FsmNode, by_: str) -> None:
         A.target(A, by_=by_)
 
     else:
-        fA1 = Fsm(by_)
-        fa1_ending_nodes = fA1.get_ending_nodes()
+        A, B = make_nfa(by_)
 
-        S.target(fA1.head)
+        S.target(A)
 
-        for f_ending in fa1_ending_nodes:
-            f_ending.target(fA1.head)
-            f_ending.target(Z)
-            f_ending.exitable = False
+        B.target(A)
+        B.target(Z)
 
     return Z
 
 
-def one_ahead(S: FsmNode, by_: str|list) -> FsmNode:
+def one_ahead(S: FsmNode, by_: str | CharSet | Group) -> FsmNode:
     """
         nm
     """
     Z = FsmNode()
-    if isinstance(by_, str):
+    if not isinstance(by_, Group):
         S.target(Z, by_=by_)
 
     else:
-        f = Fsm(by_)
-        f_ending_nodes = f.get_ending_nodes()
-        S.target(f.head, None)
-        for f_ending in f_ending_nodes:
-            f_ending.target(Z)
-            f_ending.exitable = False
+        A, B = make_nfa(by_)
+        S.target(A, None)
+        B.target(Z)
 
     return Z
 
-operator_to_func = {
-    "*": zero_or_more,
-    "+": one_or_more,
-    "?": zero_or_one,
-    None: one_ahead
-}
+def repeat_range(S: FsmNode, by_: str | CharSet | Group, low: int, high: int | None) -> FsmNode:
+    """
+        n{low,high}: low обязательных копий подряд, затем либо петля n+ / n*
+        (high=None), либо high-low необязательных копий, из-за каждой из
+        которых ведет e-дуга в общий выход.
+
+        Фрагменты НКА между копиями не делятся: каждая копия группы - свой
+        make_nfa, иначе пути разных копий склеились бы и счет повторов
+        потерялся. Поэтому НКА такого же размера, как у вставленных подряд
+        копий; выигрыш - в длине шаблона и в одном выходе вместо цепочки
+        n?n?... Размер ограничен в parse() (MAX_REPEAT, MAX_EXPANDED).
+    """
+    tail = S
 
-def make_chain(tokens: list[str], operator_to_func=operator_to_func) -> FsmNode:
+    if high is None:
+        for _ in range(low - 1):
+            tail = one_ahead(tail, by_)
+        return one_or_more(tail, by_) if low else zero_or_more(tail, by_)
 
-    head = FsmNode()
-    tail = head
-    for tok in tokens:
+    for _ in range(low):
+        tail = one_ahead(tail, by_)
 
-        ## tok может быть списком, тогда мы вынуждены костылять ##
-        
-        by_ = tok[0]
-
-        if len(tok) == 2:
-            operator = tok[1]
-        else:
-            operator = None
+    Z = FsmNode()
+    for _ in range(high - low):
+        tail.target(Z)
+        tail = one_ahead(tail, by_)
+    tail.target(Z)
 
-        tail = operator_to_func[operator](tail, by_)
+    return Z
 
-    tail.exitable = True
 
-    return head
+## {(low, high): func}
+repeat_to_func = {
+    (0, None): zero_or_more,
+    (1, None): one_or_more,
+    (0, 1)   : zero_or_one,
+}
 
 
-def split_pattern(pattern: str):
+def edge_label(node: Char | Class | Group) -> str | CharSet | Group:
     """
-        "ab(cd(e)f(g))hij(kl)" -> ['ab', ['cd', ['e'], 'f', ['g']], 'hij', ['kl']]
+        Символ или класс - метка дуги, группа - вложенный НКА.
     """
+    if isinstance(node, Char):
+        return node.char
+    if isinstance(node, Class):
+        return node.charset
+    return node
 
-    result = [""]
-    stack = [result]
 
-    for char in pattern:
-        curr_list = stack[-1] 
+def make_chain(nodes: list[Node]) -> tuple[FsmNode, FsmNode]:
 
-        if char == '(':
-            new_list = [""]
-            curr_list.append(new_list)
-            stack.append(new_list)
-
-        elif char == ")":
-            stack.pop()
+    head = FsmNode()
+    tail = head
+    for node in nodes:
 
-        else: 
-            if isinstance(curr_list[-1], str):
-                curr_list[-1] = curr_list[-1] + char
+        if isinstance(node, Repeat):
+            func = repeat_to_func.get((node.low, node.high))
+            if func is not None:
+                tail = func(tail, edge_label(node.node))
             else:
-                curr_list.append(char)
-
-    return result
-
-
-class _Fsm:
-
-    def __init__(self, pattern: str | list[str | list]):
-
-        if isinstance(pattern, str):
-            pieces = split_pattern(pattern)
+                tail = repeat_range(tail, edge_label(node.node), node.low, node.high)
         else:
-            pieces = pattern
+            tail = one_ahead(tail, edge_label(node))
+
+    return head, tail
 
-        self.head = FsmNode()
 
-        alternatives = [[]]
-        for i in range(len(pieces)):
+def make_nfa(group: Group) -> tuple[FsmNode, FsmNode]:
+    """
+        Собрать НКА группы (вход, выход) вместе со всеми вложенными группами.
+        Детерминизации здесь нет: она делается один раз для всего шаблона.
+    """
+    head = FsmNode()
+    tail = FsmNode()
 
-            sub = pieces[i]
+    for alternative in group.alternatives:
+        chain_head, chain_tail = make_chain(alternative)
+        head.target(chain_head, None)
+        chain_tail.target(tail, None)
 
-            if isinstance(sub, str):
-                for token in Tokenizer.tokenize(sub):
-                    if token == "|":
-                        alternatives.append([])
-                    else:
-                        alternatives[-1].append(token)
-            else:  # isinstance(sub, list):
-                if (
-                    i < len(pieces) - 1
-                    and isinstance(pieces[i+1], str)
-                    and pieces[i+1][0] in {"*", "+", "?"}
-                ):
-                    operator_or_None = pieces[i+1][0]
-                    pieces[i+1] = pieces[i+1][1:]
-                else:
-                    operator_or_None = None
+    return head, tail
 
-                alternatives[-1].append((sub, operator_or_None))
 
-        for alternative in alternatives:
-            self.head.target(make_chain(alternative), None)
+class _Fsm:
 
-        self.optimize()
+    #  Если задан, вызывается после сборки каждого автомата: stats_hook(fsm, fsm.stats()).
+    #  Задается на классе: Fsm.stats_hook = report
+    stats_hook = None
+
+    def __init__(
+        self,
+        pattern   : str | Group,
+        minimize  : bool = True,
+        lazy      : bool = False,
+        codegen   : bool = False,
+        prefilter : bool = True,
+        max_states: int = MAX_STATES
+    ):
+
+        ## {фаза: секунды}
+        self.timings: dict[str, float] = dict()
+        ## {что: сколько} - размеры НКА/ДКА по ходу сборки
+        self.counts: dict[str, int] = dict()
+
+        started = time.perf_counter()
+        tree = parse(pattern) if isinstance(pattern, str) else pattern
+        self.timings["parse"] = time.perf_counter() - started
+
+        #  Обязательные литералы шаблона - отсев строк до запуска автомата
+        started = time.perf_counter()
+        self.prefilter = Prefilter.from_tree(tree) if prefilter else None
+        self.timings["prefilter"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.head, tail = make_nfa(tree)
+        tail.exitable = True
+        self.timings["nfa"] = time.perf_counter() - started
+
+        self.optimize(minimize, lazy, codegen, max_states)
+
+        self.report_stats()
+
+    @classmethod
+    def from_table(cls, table: FsmTable, codegen: bool = False) -> "_Fsm":
+        """
+            Автомат из готовой таблицы, без разбора шаблона (графа FsmNode у него нет).
+        """
+        fsm = cls.__new__(cls)
+        fsm.head = None
+        fsm.removed_states = 0
+        fsm.prefilter = None
+        fsm.timings, fsm.counts = dict(), dict()
+        fsm.table = fsm.matcher = table
+        if codegen:
+            fsm.matcher = CodegenMatcher(table)
+        return fsm
+
+    def dumps(self) -> bytes:
+        if self.table is None:
+            raise ValueError("У ленивого автомата нет таблицы, сохранять нечего")
+        return self.table.to_bytes()
+
+    @classmethod
+    def loads(cls, data: bytes, codegen: bool = False) -> "_Fsm":
+        return cls.from_table(FsmTable.from_bytes(data), codegen)
 
     def get_ending_nodes(self):
         return [node for node in self.get_all_nodes() if node.exitable]
 
-    def match(self, string):
-
-        cur_node = self.head
-
-        for char in string:
-            if char in cur_node.transitions:
-                cur_node = cur_node.transitions[char][0]
-            else:
-                return False
-            
-        return cur_node.exitable
-
-    def get_all_nodes(self) -> list[FsmNode]:
-
-        visited  : set[UUID]     = set()
-        queue    : list[FsmNode] = [self.head]
-        result   : list[FsmNode] = []
+    @property
+    def matcher(self):
+        return self._matcher
+
+    @matcher.setter
+    def matcher(self, matcher) -> None:
+        self._matcher = matcher
+        self.bind_match()
+
+    @property
+    def prefilter(self):
+        return self._prefilter
+
+    @prefilter.setter
+    def prefilter(self, prefilter) -> None:
+        self._prefilter = prefilter
+        self.bind_match()
+
+    def bind_match(self) -> None:
+        """
+            Без отсева fsm.match - прямо matcher.match (например,
+            FsmTable.match): на коротких строках лишний вызов-обертка
+            заметен. Перепривязывается при каждой замене matcher или prefilter.
+        """
+        if type(self).match is not _Fsm.match or "_matcher" not in self.__dict__:
+            #  У наследника свой match (FsmSet) или автомат еще собирается
+            return
+
+        if getattr(self, "_prefilter", None) is None:
+            self.match = self._matcher.match
+        else:
+            self.__dict__.pop("match", None)
 
-        while queue:
-            current_node = queue.pop(0)
+    def match(self, string):
+        if self.prefilter is not None and not self.prefilter.check(string):
+            return False
+        return self.matcher.match(string)
+
+    def count_matches(self, enabled: bool = True) -> None:
+        """
+            Включить/выключить счетчики match() и отсева (см. CountingMatcher,
+            CountingPrefilter и stats()["match"], stats()["prefilter"]).
+        """
+        counting = isinstance(self.matcher, CountingMatcher)
+
+        if enabled and not counting:
+            self.matcher = CountingMatcher(self.matcher)
+        elif not enabled and counting:
+            self.matcher = self.matcher.matcher
+
+        if self.prefilter is None:
+            return
+
+        counting = isinstance(self.prefilter, CountingPrefilter)
+
+        if enabled and not counting:
+            self.prefilter = CountingPrefilter(self.prefilter)
+        elif not enabled and counting:
+            self.prefilter = self.prefilter.prefilter
+
+    def stats(self) -> dict:
+        """
+            Времена фаз сборки (timings), размеры НКА и ДКА (removed_states -
+            сколько состояний убрала минимизация), а также счетчики ленивого
+            автомата (lazy) и match() (match), если они есть.
+        """
+        result: dict = dict(self.counts)
+        result["timings"] = dict(self.timings)
+        result["total_seconds"] = sum(self.timings.values())
+
+        matcher = self.matcher
+        if isinstance(matcher, CountingMatcher):
+            result["match"] = matcher.stats()
+            matcher = matcher.matcher
+
+        if isinstance(matcher, LazyDfa):
+            result["lazy"] = matcher.stats()
+
+        if self.prefilter is not None:
+            result["prefilter"] = self.prefilter.stats()
 
-            if current_node.id not in visited:
-                visited.add(current_node.id)
-                result.append(current_node)
+        return result
 
-                for by_ in current_node.transitions:
-                    for node in current_node.transitions[by_]:
-                        if node.id not in visited:
-                            queue.append(node)
+    def report_stats(self) -> None:
+        hook = type(self).stats_hook
+        if hook is not None:
+            hook(self, self.stats())
+
+    def match_many(self, strings, offsets=None):
+        """
+            Разобрать пачку строк (или склеенный буфер с границами offsets), вернуть numpy-массив bool.
+        """
+        if self.prefilter is not None and offsets is None and not isinstance(strings, (str, bytes)):
+            #  Автомат запускается только на строках, прошедших отсев
+            strings = list(strings)
+            passed = batch.match_each(self.prefilter, strings)
+            result = passed.copy()
+            result[passed] = self.match_batch([string for string, ok in zip(strings, passed) if ok])
+            return result
+
+        return self.match_batch(strings, offsets)
+
+    def match_batch(self, strings, offsets=None):
+        if self.table is None:
+            return batch.match_each(self.matcher, strings, offsets)
+
+        return batch.match_many(self.table, strings, offsets)
+
+    def match_parallel(self, source, workers: int | None = None, **kwargs):
+        """
+            Разобрать файл (путь) или итерируемое из строк пулом процессов,
+            bool на строку в исходном порядке. См. pool.match_chunks.
+        """
+        if self.table is None:
+            raise ValueError("У ленивого автомата нет таблицы, передавать рабочим нечего")
+
+        matcher = self.matcher.matcher if isinstance(self.matcher, CountingMatcher) else self.matcher
+        codegen = isinstance(matcher, CodegenMatcher)
+        return pool.match_parallel(self.table, source, workers=workers, codegen=codegen, **kwargs)
+
+    def scanner(self, chunk_size: int = 1 << 16, encoding: str = "utf-8") -> Scanner:
+        """
+            Потоковый поиск со счетчиками (scanner.stats()), см. Scanner.
+        """
+        return Scanner(self.matcher, chunk_size, encoding)
+
+    def finditer(self, source, chunk_size: int = 1 << 16, encoding: str = "utf-8"):
+        """
+            Все непересекающиеся вхождения в строке, файле, mmap или потоке кусков.
+        """
+        return self.scanner(chunk_size, encoding).finditer(source)
+
+    def search(self, source, chunk_size: int = 1 << 16, encoding: str = "utf-8") -> Match | None:
+        return self.scanner(chunk_size, encoding).search(source)
+
+    def get_all_nodes(self, head: FsmNode | None = None) -> list[FsmNode]:
+
+        head = self.head if head is None else head
+        if head is None:
+            raise ValueError(
+                f"У {self.__class__.__name__} нет графа FsmNode: он собран из таблицы (from_table, loads, кеш на диске)"
+            )
+
+        #  Обход в ширину; result сам служит очередью
+        visited  : set[FsmNode]  = {head}
+        result   : list[FsmNode] = [head]
+
+        i = 0
+        while i < len(result):
+            for targets in result[i].transitions.values():
+                for node in targets:
+                    if node not in visited:
+                        visited.add(node)
+                        result.append(node)
+            i += 1
 
         return result
     
     def __repr__(self):
-        nodes = self.get_all_nodes()
-
-        result = [
-            f"{self.__class__.__name__}({len(nodes)} nodes)",
-            "From\tTo\tBy\tExitable"
-        ]
+        return repr(self.matcher)
 
-        names = {nodes[i].id: str(i) for i in range(len(nodes))}
-
-        for node in nodes:
-            data_for_repr = node.get_data_for_repr()
-
-            for raw in data_for_repr:
-
-                result.append(
-                    "\t".join(
-                        [
-                            names[raw[0]],
-                            names[raw[1]] if raw[1] else "",
-                            raw[2],
-                            raw[3]
-                        ]
-                    )
-                )
-
-        return "\n".join(result)
-    
     def get_alphabet(self):
         alphabet = set()
         for node in self.get_all_nodes():
             for symbol in node.transitions.keys():
                 if symbol is not None:
                     alphabet.add(symbol)
-        return sorted(list(alphabet))
+        return sorted(alphabet, key=label_key)
 
 
-    def optimize(self):
-        #  Удаление e-дуг
+    def optimize(self, minimize: bool = True, lazy: bool = False, codegen: bool = False, max_states: int = MAX_STATES):
+
+        if lazy and codegen:
+            raise ValueError("Генерировать код можно только по готовой таблице, не для ленивого автомата")
+
+        self.remove_e_edges()
+
+        self.removed_states = 0
+
+        if lazy:
+            #  Состояния ДКА будут строиться по ходу match(), в кеше - не больше max_states
+            started = time.perf_counter()
+            self.table = None
+            self.matcher = LazyDfa(self.head, max_states)
+            self.timings["lazy"] = time.perf_counter() - started
+            return
+
+        self.determinize()
+        self.compile(minimize)
+
+        if codegen:
+            #  match() - сгенерированная по таблице функция Python
+            started = time.perf_counter()
+            self.matcher = CodegenMatcher(self.table)
+            self.timings["codegen"] = time.perf_counter() - started
+
+    def remove_e_edges(self):
+        #  Удаление e-дуг через e-замыкания, посчитанные один раз на узел
+        started = time.perf_counter()
+
         nodes = self.get_all_nodes()
+        self.counts["nfa_states"] = len(nodes)
+        self.counts["nfa_edges"] = sum(len(targets) for node in nodes for targets in node.transitions.values())
+
+        remove_epsilons(nodes)
+
+        self.counts["nfa_edges_no_epsilon"] = sum(
+            len(targets) for node in nodes for targets in node.transitions.values()
+        )
+        self.timings["epsilon"] = time.perf_counter() - started
 
-        for node in nodes:
-            node.del_e_edges()
+    def determinize(self) -> dict[frozenset[FsmNode], FsmNode]:
+        """
+            НКА -> ДКА. Возвращает {множество состояний НКА: состояние ДКА}.
+
+            Дуги ДКА помечены не символами, а номерами классов эквивалентности
+            (self.classes): символы, которые все метки НКА различают одинаково,
+            дают один столбец таблицы.
+        """
+        started = time.perf_counter()
 
-        #  НКА -> ДКА
         alphabet = self.get_alphabet()
+        self.classes, label_classes = ClassMap.from_labels(alphabet)
 
         initial_state = frozenset({self.head})
         dfsm_states = {initial_state: FsmNode()}
         dfsm_head = dfsm_states[initial_state]
 
-        queue = [initial_state]
+        queue = deque([initial_state])
+        peak_queue = 1
+        edges = 0
 
         while queue:
-            current_nfsm_state_set = queue.pop(0)
+            peak_queue = max(peak_queue, len(queue))
+            current_nfsm_state_set = queue.popleft()
             current_dfsm_state = dfsm_states[current_nfsm_state_set]
 
             current_dfsm_state.exitable = any(node.exitable for node in current_nfsm_state_set)
 
-            for symbol in alphabet:
+            ## {column: {nfa_state, ...}}
+            moves = dict()
+            for nfa_state in current_nfsm_state_set:
+                for by_, targets in nfa_state.transitions.items():
+                    if by_ is None or not targets:
+                        continue
+                    for column in label_classes[by_]:
+                        moves.setdefault(column, set()).update(targets)
 
-                next_nfa_state_set = set()
-                for nfa_state in current_nfsm_state_set:
-                    if symbol in nfa_state.transitions:
-                        for target_node in nfa_state.transitions[symbol]:
-                            next_nfa_state_set.add(target_node)
+            for column in sorted(moves):
 
-                next_nfa_state_set = frozenset(next_nfa_state_set)
+                next_nfa_state_set = frozenset(moves[column])
 
                 if next_nfa_state_set and next_nfa_state_set not in dfsm_states:
                     dfsm_states[next_nfa_state_set] = FsmNode()
                     queue.append(next_nfa_state_set)
 
                 if next_nfa_state_set:
-                    current_dfsm_state.target(dfsm_states[next_nfa_state_set], symbol)
+                    current_dfsm_state.target(dfsm_states[next_nfa_state_set], column)
+                    edges += 1
 
         self.head = dfsm_head
 
-T = TypeVar("T")
-
-class Stack(Generic[T]):
-
-    def __init__(self) -> None:
-        self.items: List[Type[T]] = []
-
-    def is_empty(self) -> bool:
-        return self.items == []
-
-    def push(self, item: Type[T]) -> None:
-        self.items.append(item)
+        self.counts["alphabet"] = len(alphabet)
+        self.counts["classes"] = self.classes.n_classes
+        self.counts["dfa_states"] = len(dfsm_states)
+        self.counts["dfa_edges"] = edges
+        self.counts["peak_queue"] = peak_queue
+        self.timings["determinize"] = time.perf_counter() - started
 
-    def pop(self) -> Type[T]:
-        return self.items.pop()
+        return dfsm_states
 
-    def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({self.items} <- top)"
+    def compile(self, minimize: bool = True, tags: dict[int, frozenset[int]] | None = None):
+        #  ДКА -> таблица переходов
+        started = time.perf_counter()
+        self.table = FsmTable.from_nodes(self.head, self.classes, tags)
+        self.timings["table"] = time.perf_counter() - started
 
+        #  Минимизация ДКА
+        if minimize:
+            started = time.perf_counter()
+            minimal = hopcroft(self.table)
+            self.removed_states = self.table.n_states - minimal.n_states
+            self.table = minimal
+            self.timings["minimize"] = time.perf_counter() - started
 
-def is_brackets_balanced(template: str) -> bool:
-    """
-        Проверяет, что скобочная последовательность в строке верна.
-    """
-    stack = Stack()
-
-    for char in template:
-        if char == "(":
-            stack.push(char)
-        elif char == ")":
-            if stack.is_empty():
-                return False
-            else:
-                stack.pop()
-    
-    return stack.is_empty()
+        self.counts["table_states"] = self.table.n_states - START
+        self.counts["removed_states"] = self.removed_states
+        self.matcher = self.table
 
 
 class Fsm(_Fsm):
     
-    def __init__(self, pattern: str):
-
-        if not is_brackets_balanced(pattern):
-            raise Exception(f"В паттерне \"{pattern}\" со скобочками беда.")
-        
-        super().__init__(pattern)
+    def __init__(
+        self,
+        pattern   : str,
+        minimize  : bool = True,
+        lazy      : bool = False,
+        codegen   : bool = False,
+        prefilter : bool = True,
+        max_states: int = MAX_STATES
+    ):
+
+        #  Кривой шаблон (в т.ч. несбалансированные скобки) - TemplateError из parse()
+        super().__init__(pattern, minimize, lazy, codegen, prefilter, max_states)
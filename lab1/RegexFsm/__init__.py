@@ -1 +1,3 @@
-from .Fsm import Fsm
\ No newline at end of file
+from .Fsm import Fsm
+from .fsm_set import FsmSet
+from .cache import compile
\ No newline at end of file
@@ -0,0 +1,142 @@
+from itertools import islice
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для пакетного разбора
+    np = None
+
+from RegexFsm.table import FsmTable, START
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Для match_many нужен numpy: pip install numpy")
+
+
+def _classify(table: FsmTable, codes: "np.ndarray") -> "np.ndarray":
+    """
+        Коды символов -> номера столбцов (классов) таблицы.
+    """
+    bounds = np.array(table.classes.bounds, dtype=np.uint32)
+    classes = np.array(table.classes.classes, dtype=np.intp)
+
+    #  Для небольших кодов дешевле плотная таблица перекодировки
+    top = int(codes.max()) + 1 if len(codes) else 0
+    if top <= 1 << 16:
+        lookup = classes[np.searchsorted(bounds, np.arange(top, dtype=np.uint32), side="right") - 1]
+        return lookup[codes]
+
+    return classes[np.searchsorted(bounds, codes, side="right") - 1]
+
+
+def run_packed(table: FsmTable, buffer: str | bytes, offsets) -> "np.ndarray":
+    """
+        Прогнать строки buffer[offsets[i]:offsets[i+1]] все разом, вернуть
+        конечное состояние таблицы для каждой.
+
+        Строки сортируются по убыванию длины, поэтому на шаге j живые строки -
+        это префикс массива, и состояния всех строк обновляются одной
+        векторной операцией над таблицей переходов.
+        bytes трактуются как latin-1: один байт - один символ.
+    """
+    _require_numpy()
+
+    if isinstance(buffer, str):
+        codes = np.frombuffer(buffer.encode("utf-32-le"), dtype=np.uint32)
+    else:
+        codes = np.frombuffer(buffer, dtype=np.uint8).astype(np.uint32)
+
+    offsets = np.asarray(offsets, dtype=np.intp)
+    starts, lengths = offsets[:-1], np.diff(offsets)
+
+    if not len(starts):
+        return np.zeros(0, dtype=np.intc)
+
+    classes = _classify(table, codes)
+    transitions = np.frombuffer(table.transitions, dtype=np.intc)
+    width = table.width
+
+    order = np.argsort(-lengths, kind="stable")
+    starts = starts[order]
+    negative_lengths = -lengths[order]
+
+    states = np.full(len(starts), START, dtype=np.intc)
+
+    for j in range(-negative_lengths[0]):
+        alive = np.searchsorted(negative_lengths, -j, side="left")
+        states[:alive] = transitions[states[:alive] * width + classes[starts[:alive] + j]]
+
+        #  Все еще читаемые строки отвергнуты - дальше шагать незачем
+        if j % 64 == 63 and not states[:alive].any():
+            break
+
+    result = np.empty(len(starts), dtype=np.intc)
+    result[order] = states
+    return result
+
+
+def accepting_mask(table: FsmTable) -> "np.ndarray":
+    return np.frombuffer(table.accepting, dtype=np.uint8).astype(bool)
+
+
+def match_packed(table: FsmTable, buffer: str | bytes, offsets) -> "np.ndarray":
+    """
+        Разобрать строки buffer[offsets[i]:offsets[i+1]] все разом, массив bool.
+    """
+    return accepting_mask(table)[run_packed(table, buffer, offsets)]
+
+
+def run_many(
+    table     : FsmTable,
+    strings   : Iterable[str] | str | bytes,
+    offsets   = None,
+    batch_size: int = 1 << 16
+) -> "np.ndarray":
+    """
+        Конечные состояния таблицы для многих строк (массив номеров).
+
+        strings - список/итератор строк (разбирается пачками по batch_size),
+        либо склеенный буфер, если заданы offsets (n+1 границ).
+    """
+    _require_numpy()
+
+    if offsets is not None:
+        return run_packed(table, strings, offsets)
+
+    strings = iter(strings)
+    results = []
+
+    while batch := list(islice(strings, batch_size)):
+        offsets = np.zeros(len(batch) + 1, dtype=np.intp)
+        np.cumsum(np.fromiter(map(len, batch), dtype=np.intp, count=len(batch)), out=offsets[1:])
+        results.append(run_packed(table, "".join(batch), offsets))
+
+    return np.concatenate(results) if results else np.zeros(0, dtype=np.intc)
+
+
+def match_many(
+    table     : FsmTable,
+    strings   : Iterable[str] | str | bytes,
+    offsets   = None,
+    batch_size: int = 1 << 16
+) -> "np.ndarray":
+    """
+        Разобрать много строк одним автоматом, вернуть массив bool (см. run_many).
+    """
+    _require_numpy()
+    return accepting_mask(table)[run_many(table, strings, offsets, batch_size)]
+
+
+def match_each(matcher, strings: Iterable[str] | str | bytes, offsets=None) -> "np.ndarray":
+    """
+        То же, что match_many, но строки по одной через matcher.match
+        (для автоматов без таблицы переходов, например LazyDfa).
+    """
+    _require_numpy()
+
+    if offsets is not None:
+        buffer = strings if isinstance(strings, str) else bytes(strings).decode("latin-1")
+        strings = (buffer[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1))
+
+    return np.fromiter(map(matcher.match, strings), dtype=bool)
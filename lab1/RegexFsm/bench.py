@@ -0,0 +1,587 @@
+"""
+    Замеры скорости RegexFsm.
+
+    Запуск из папки lab1:
+        python -m RegexFsm.bench                        # все разделы
+        python -m RegexFsm.bench suite -o new.json      # набор семейств шаблонов в JSON
+        python -m RegexFsm.bench suite --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from RegexFsm import Fsm
+from RegexFsm.Fsm import make_nfa
+from RegexFsm.parser import parse
+from RegexFsm.table import DEAD, START
+
+
+DIGIT = "(1|2|3|4|5|6|7|8|9|0)"
+OPTIONAL_SEP = "(-|| )?"
+
+#  Телефонный номер из lab1.ipynb
+TELNUM = (
+    f"((8|/+?7){OPTIONAL_SEP})?"
+    + f"({DIGIT*3}{OPTIONAL_SEP})?"
+    + DIGIT*3
+    + OPTIONAL_SEP
+    + DIGIT*2
+    + OPTIONAL_SEP
+    + DIGIT*2
+    + OPTIONAL_SEP
+)
+
+
+#  То же с классами символов
+TELNUM_CLASSES = TELNUM.replace(DIGIT, "[0-9]").replace(OPTIONAL_SEP, "[- ]?")
+
+
+def random_telnums(n: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    return [
+        rnd.choice(["+7", "8", ""]) + rnd.choice(["-", " ", ""]).join(
+            "".join(rnd.choice("0123456789") for _ in range(size))
+            for size in (3, 3, 2, 2)
+        ) + rnd.choice(["", "x"])
+        for _ in range(n)
+    ]
+
+
+def nested_pattern(depth: int) -> str:
+    """
+        depth=2 -> "(a(b|c)*d|e)?f"
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    pattern = "(b|c)"
+    for level in range(depth):
+        first, last = letters[(2 * level) % 26], letters[(2 * level + 3) % 26]
+        pattern = f"({first}{pattern}{'*?+'[level % 3]}{last}|{letters[(level + 4) % 26]})"
+
+    return pattern + "z"
+
+
+def timeit(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def literal_pattern(n: int) -> str:
+    """
+        Цепочка из n литералов, повторяемая целиком: "(abc...)*".
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return "(" + "".join(letters[i * 7 % 26] for i in range(n)) + ")*"
+
+
+def keyword_union(n_chars: int, seed: int = 0) -> str:
+    """
+        "(kw|kw|...)" длиной не меньше n_chars - как сгенерированные списки ключевых слов.
+    """
+    rnd = random.Random(seed)
+    words = []
+    size = 2
+    while size < n_chars:
+        word = "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz_") for _ in range(rnd.randint(3, 12)))
+        words.append(word)
+        size += len(word) + 1
+    return "(" + "|".join(words) + ")"
+
+
+def blowup_pattern(n: int) -> str:
+    """
+        (a|b)*a(a|b)^n - минимальный ДКА экспоненциален по n.
+    """
+    return "(a|b)*a" + "(a|b)" * n
+
+
+## {семейство: (параметр -> шаблон, значения параметра по умолчанию)}
+FAMILIES = {
+    "literal": (literal_pattern, (10, 100, 1000)),
+    "nested" : (nested_pattern, (4, 16, 64)),
+    "blowup" : (blowup_pattern, (4, 8, 12)),
+    "telnum" : (lambda n: TELNUM, (1,)),
+    "union"  : (keyword_union, (1_000, 10_000, 30_000)),
+}
+
+
+def count_nfa_states(pattern: str) -> int:
+    head, _ = make_nfa(parse(pattern))
+
+    visited = {head.id}
+    stack = [head]
+    while stack:
+        node = stack.pop()
+        for targets in node.transitions.values():
+            for target in targets:
+                if target.id not in visited:
+                    visited.add(target.id)
+                    stack.append(target)
+
+    return len(visited)
+
+
+def random_walks(f: Fsm, length: int, count: int, rnd: random.Random) -> list[str]:
+    """
+        count строк до length символов, которые автомат дочитывает до конца,
+        не попадая в мертвое состояние (короче, если дальше идти некуда).
+    """
+    table = f.table
+    ranges = [table.classes.ranges_of(column) for column in range(table.width)]
+
+    ## moves[state] = [(диапазоны символов, to), ...]
+    moves = [
+        [(ranges[column], to) for column, to in enumerate(row) if to != DEAD and ranges[column]]
+        for row in table.rows
+    ]
+
+    result = []
+    for _ in range(count):
+        chars = []
+        state = START
+
+        while len(chars) < length and moves[state]:
+            char_ranges, state = rnd.choice(moves[state])
+            lo, hi = rnd.choice(char_ranges)
+            chars.append(chr(rnd.randint(lo, min(hi, lo + 25))))
+
+        result.append("".join(chars))
+
+    return result
+
+
+def measure_case(family: str, size: int, lengths, repeat: int, strings: int) -> dict:
+    pattern = FAMILIES[family][0](size)
+
+    build = timeit(lambda: Fsm(pattern), repeat)
+    f = Fsm(pattern)
+    stats = f.stats()
+
+    #  Минимизация ничего не теряет: ДКА до нее = итоговая таблица + убранные
+    if stats["dfa_states"] != stats["table_states"] + stats["removed_states"]:
+        raise AssertionError(f"{family} {size}: removed_states не сходится с dfa_states")
+
+    #  Пиковая память отдельным прогоном: tracemalloc сам замедляет сборку
+    tracemalloc.start()
+    Fsm(pattern)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rnd = random.Random(size)
+    match = []
+    for length in lengths:
+        inputs = random_walks(f, length, strings, rnd)
+        chars = sum(map(len, inputs))
+        seconds = timeit(lambda: [f.match(string) for string in inputs], repeat)
+        match.append({
+            "length"          : length,
+            "strings"         : strings,
+            "chars"           : chars,
+            "seconds"         : seconds,
+            "strings_per_sec" : strings / seconds,
+            "chars_per_sec"   : chars / seconds,
+        })
+
+    return {
+        "family"         : family,
+        "size"           : size,
+        "pattern_length" : len(pattern),
+        "build_seconds"  : build,
+        "nfa_states"     : count_nfa_states(pattern),
+        "dfa_states"     : stats["dfa_states"],
+        "min_dfa_states" : stats["table_states"],
+        "columns"        : f.table.width,
+        "peak_bytes"     : peak,
+        "match"          : match,
+    }
+
+
+def bench_suite(
+    families=tuple(FAMILIES),
+    lengths=(10, 100, 1000),
+    repeat: int = 3,
+    strings: int = 1000
+) -> list[dict]:
+    """
+        Сборка и match() для каждого семейства шаблонов и каждого размера.
+    """
+    print("family\tsize\tbuild s\tNFA\tDFA\tminDFA\tpeak KiB\t" + "\t".join(f"chars/s @{n}" for n in lengths))
+
+    results = []
+    for family in families:
+        for size in FAMILIES[family][1]:
+            case = measure_case(family, size, lengths, repeat, strings)
+            results.append(case)
+            print(
+                family,
+                size,
+                f"{case['build_seconds']:.5f}",
+                case["nfa_states"],
+                case["dfa_states"],
+                case["min_dfa_states"],
+                f"{case['peak_bytes'] / 1024:,.0f}",
+                *(f"{m['chars_per_sec']:,.0f}" for m in case["match"]),
+                sep="\t"
+            )
+
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """
+        Отношения к прошлому прогону: >1 - стало быстрее (для памяти - меньше).
+    """
+    print("family\tsize\tbuild\tpeak\t" + "\t".join(f"@{m['length']}" for m in results[0]["match"]))
+
+    old = {(case["family"], case["size"]): case for case in baseline}
+    for case in results:
+        before = old.get((case["family"], case["size"]))
+        if before is None:
+            continue
+
+        before_match = {m["length"]: m for m in before["match"]}
+        print(
+            case["family"],
+            case["size"],
+            f"{before['build_seconds'] / case['build_seconds']:.2f}x",
+            f"{before['peak_bytes'] / case['peak_bytes']:.2f}x",
+            *(
+                f"{m['chars_per_sec'] / before_match[m['length']]['chars_per_sec']:.2f}x"
+                if m["length"] in before_match else "-"
+                for m in case["match"]
+            ),
+            sep="\t"
+        )
+
+
+def bench_parse(sizes=(10_000, 100_000, 1_000_000)) -> None:
+    print("Parsing large generated patterns")
+    print("pattern\tchars\tseconds\tchars/s")
+
+    for size in sizes:
+        for name, pattern in (("union", keyword_union(size)), ("literal", "a" * size)):
+            seconds = timeit(lambda: parse(pattern), repeat=3)
+            print(name, len(pattern), f"{seconds:.4f}", f"{len(pattern) / seconds:,.0f}", sep="\t")
+
+
+def bench_nested_construction(depths=(1, 2, 4, 8, 16, 32, 64, 128)) -> None:
+    print("Construction of nested groups")
+    print("depth\tseconds\tstates")
+
+    for depth in depths:
+        pattern = nested_pattern(depth)
+        seconds = timeit(lambda: Fsm(pattern))
+        print(depth, f"{seconds:.5f}", Fsm(pattern).table.n_states, sep="\t")
+
+
+def bench_classes() -> None:
+    print("Digits spelled out vs character classes")
+    print("pattern\tseconds\tstates\tcolumns")
+
+    for name, pattern in (("(1|2|...)", TELNUM), ("[0-9]", TELNUM_CLASSES)):
+        seconds = timeit(lambda: Fsm(pattern))
+        table = Fsm(pattern).table
+        print(name, f"{seconds:.5f}", table.n_states, table.width, sep="\t")
+
+
+def bench_repeat(counts=(10, 100, 1000)) -> None:
+    print("Bounded repetition {m,n} vs pasted copies")
+    print("pattern\tcount\tlength\tseconds\tnfa states\tdfa states")
+
+    cases = [
+        ("[0-9]{n}", lambda n: f"[0-9]{{{n}}}", lambda n: "[0-9]" * n),
+        ("(ab|c){n}", lambda n: f"(ab|c){{{n}}}", lambda n: "(ab|c)" * n),
+        ("a{0,n}", lambda n: f"a{{0,{n}}}", lambda n: "a?" * n),
+        ("[a-z]{n,}", lambda n: f"[a-z]{{{n},}}", lambda n: "[a-z]" * (n - 1) + "[a-z]+"),
+    ]
+
+    for name, counted, pasted in cases:
+        for n in counts:
+            for label, pattern in (("{}", counted(n)), ("copies", pasted(n))):
+                seconds = timeit(lambda: Fsm(pattern, prefilter=False), repeat=1)
+                stats = Fsm(pattern, prefilter=False).stats()
+                print(
+                    f"{name} {label}",
+                    n,
+                    len(pattern),
+                    f"{seconds:.5f}",
+                    stats["nfa_states"],
+                    stats["table_states"],
+                    sep="\t"
+                )
+
+
+def bench_codegen(n: int = 20_000) -> None:
+    print(f"Interpreted table vs generated code, {n} strings each")
+    print("pattern\tstates\ttable str/s\tcodegen str/s\tspeedup")
+
+    rnd = random.Random(0)
+    words = ["".join(rnd.choice("abcdefghij") for _ in range(rnd.randint(3, 12))) for _ in range(n)]
+
+    cases = [
+        ("literal", "connection refused by peer", ["connection refused by peer"] * (n // 2) + ["connection reset"] * (n // 2)),
+        ("telnum", TELNUM_CLASSES, random_telnums(n)),
+        ("email", "[a-z]+@[a-z]+/.(com|ru)", [f"{word}@{word[::-1]}.ru" for word in words]),
+        ("nested 16", nested_pattern(16), words),
+        ("nested 64", nested_pattern(64), words),
+    ]
+
+    for name, pattern, strings in cases:
+        table, generated = Fsm(pattern), Fsm(pattern, codegen=True)
+
+        loop = timeit(lambda: [table.match(string) for string in strings], repeat=3)
+        code = timeit(lambda: [generated.match(string) for string in strings], repeat=3)
+
+        print(
+            name,
+            table.table.n_states,
+            f"{n / loop:,.0f}",
+            f"{n / code:,.0f}",
+            f"{loop / code:.2f}x",
+            sep="\t"
+        )
+
+
+def bench_prefilter(n: int = 20_000) -> None:
+    print(f"Required-literal prefilter, {n} mostly non-matching strings each")
+    print("pattern\tliterals\treject rate\twithout str/s\twith str/s\tspeedup")
+
+    rnd = random.Random(0)
+    sentences = [
+        " ".join(rnd.choice(["I", "you", "love", "LUFF", "Rome", "Moscow", "Madrid", "visit"]) for _ in range(rnd.randint(2, 6)))
+        for _ in range(n)
+    ]
+    lines = [
+        " ".join(rnd.choice(["error:", "disk", "full", "timeout", "retry", "ok", "warning:"]) for _ in range(rnd.randint(3, 12)))
+        for _ in range(n)
+    ]
+    words = ["".join(rnd.choice("abcdefghij") for _ in range(rnd.randint(5, 30))) for _ in range(n)]
+    emails = [word if rnd.random() < 0.9 else f"{word[:4]}@{word[4:]}.ru" for word in words]
+
+    cases = [
+        ("lab1", "I (love|LU+FF?) (Moscow|Ma(drid|gadan)|Rome)(/.|!|/?)?", sentences),
+        ("log", "error: [a-z ]*timeout", lines),
+        ("email", "[a-z]+@[a-z]+/.(com|ru)", emails),
+    ]
+
+    for name, pattern, strings in cases:
+        plain, filtered = Fsm(pattern, prefilter=False), Fsm(pattern)
+
+        if filtered.prefilter is None:
+            #  Кроме префикса и короткого суффикса (их автомат проверяет сам)
+            #  обязательных литералов нет
+            print(name, "-", "-", "-", "-", "-", sep="\t")
+            continue
+
+        without = timeit(lambda: [plain.match(string) for string in strings], repeat=3)
+        with_ = timeit(lambda: [filtered.match(string) for string in strings], repeat=3)
+
+        #  Доля отсеянных - отдельным проходом: счетчики замедляют match()
+        filtered.count_matches()
+        for string in strings:
+            filtered.match(string)
+        stats = filtered.stats()["prefilter"]
+        filtered.count_matches(False)
+        literals = [*stats["inner"], stats["suffix"]]
+
+        print(
+            name,
+            " ".join(repr(literal) for literal in literals if literal),
+            f"{stats['reject_rate']:.1%}",
+            f"{n / without:,.0f}",
+            f"{n / with_:,.0f}",
+            f"{without / with_:.2f}x",
+            sep="\t"
+        )
+
+
+class DictNode:
+    def __init__(self, exitable: bool) -> None:
+        ## {символ: [узел]}
+        self.transitions: dict[str, list["DictNode"]] = dict()
+        self.exitable = exitable
+
+
+class DictMatcher:
+    """
+        match() до таблицы переходов: ДКА - граф узлов, переход - словарь
+        {символ: [узел]}. Собирается по таблице для символов alphabet,
+        только чтобы сравнивать цену одного вызова на коротких строках.
+    """
+
+    def __init__(self, table, alphabet: str) -> None:
+        nodes = [DictNode(bool(flag)) for flag in table.accepting]
+        for state in range(START, table.n_states):
+            for char in alphabet:
+                to = table.step(state, char)
+                if to != DEAD:
+                    nodes[state].transitions[char] = [nodes[to]]
+        self.head = nodes[START]
+
+    def match(self, string):
+
+        cur_node = self.head
+
+        for char in string:
+            if char in cur_node.transitions:
+                cur_node = cur_node.transitions[char][0]
+            else:
+                return False
+
+        return cur_node.exitable
+
+
+def bench_short(n: int = 200_000) -> None:
+    print(f"Per-call latency of match() on short strings, {n} calls each")
+    print("pattern	dict ns/call	match() ns/call	speedup")
+
+    cases = [
+        ("abcd", "abcd", ["abcd", "abce", "abc", "x"] * (n // 4)),
+        ("telnum", TELNUM, random_telnums(n)),
+    ]
+
+    for name, pattern, strings in cases:
+        fsm = Fsm(pattern)
+        old = DictMatcher(fsm.table, "".join(set("".join(strings))))
+
+        if [old.match(string) for string in strings] != [fsm.match(string) for string in strings]:
+            raise AssertionError(f"{name}: словарный и табличный match() расходятся")
+
+        #  Замеры вперемешку, чтобы шум машины доставался обоим поровну
+        dict_seconds = table_seconds = float("inf")
+        for _ in range(5):
+            dict_seconds = min(dict_seconds, timeit(lambda: [old.match(string) for string in strings], repeat=1))
+            table_seconds = min(table_seconds, timeit(lambda: [fsm.match(string) for string in strings], repeat=1))
+
+        print(
+            name,
+            f"{dict_seconds / n * 1e9:.0f}",
+            f"{table_seconds / n * 1e9:.0f}",
+            f"{dict_seconds / table_seconds:.2f}x",
+            sep="\t"
+        )
+
+
+def bench_match_many(n: int = 100_000) -> None:
+    print(f"Matching {n} phone numbers")
+
+    f = Fsm(TELNUM)
+    strings = random_telnums(n)
+
+    loop = timeit(lambda: [f.match(string) for string in strings], repeat=3)
+    many = timeit(lambda: f.match_many(strings), repeat=3)
+
+    print("match() loop", f"{loop:.4f}s", f"{n / loop:,.0f} str/s", sep="\t")
+    print("match_many()", f"{many:.4f}s", f"{n / many:,.0f} str/s", sep="\t")
+
+
+def bench_parallel(n: int = 1_000_000, workers=None) -> None:
+    cores = os.cpu_count() or 1
+    workers = workers or sorted({1, 2, 4, cores})
+    print(f"Matching {n} phone numbers from a file, {cores} CPU(s)")
+    print("workers\tseconds\tstr/s\tspeedup")
+
+    f = Fsm(TELNUM)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "telnums.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(random_telnums(n)) + "\n")
+
+        def in_process():
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    f.match(line[:-1])
+
+        single = timeit(in_process, repeat=1)
+        print("-", f"{single:.3f}", f"{n / single:,.0f}", "1.00x", sep="\t")
+
+        for count in workers:
+            seconds = timeit(lambda: sum(f.match_parallel(path, workers=count)), repeat=1)
+            print(count, f"{seconds:.3f}", f"{n / seconds:,.0f}", f"{single / seconds:.2f}x", sep="\t")
+
+
+def bench_finditer(lines: int = 20_000) -> None:
+    print(f"Streaming search over a {lines}-line log")
+
+    f = Fsm(TELNUM)
+    log = "".join(f"{i} INFO call from {number} ok\n" for i, number in enumerate(random_telnums(lines)))
+    chunks = [log[i:i + 4096] for i in range(0, len(log), 4096)]
+
+    scanner = f.scanner()
+    found = sum(1 for _ in scanner.finditer(iter(chunks)))
+
+    print("matches", found, sep="\t")
+    print("chars", scanner.chars_read, sep="\t")
+    print("char/s", f"{scanner.throughput:,.0f}", sep="\t")
+
+
+SECTIONS = {
+    "suite"     : None,
+    "parse"     : bench_parse,
+    "nested"    : bench_nested_construction,
+    "classes"   : bench_classes,
+    "repeat"    : bench_repeat,
+    "codegen"   : bench_codegen,
+    "prefilter" : bench_prefilter,
+    "short"     : bench_short,
+    "match_many": bench_match_many,
+    "finditer"  : bench_finditer,
+    "parallel"  : bench_parallel,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m RegexFsm.bench", description="Замеры скорости RegexFsm")
+    parser.add_argument("sections", nargs="*", metavar="section", help=f"что замерять: {', '.join(SECTIONS)} (по умолчанию все)")
+    parser.add_argument("--family", action="append", choices=list(FAMILIES), help="семейства для suite (по умолчанию все)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000], help="длины входных строк")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--strings", type=int, default=1000, help="строк на каждую длину")
+    parser.add_argument("-o", "--output", help="сохранить результаты suite в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"неизвестные разделы: {', '.join(sorted(unknown))}")
+
+    for section in args.sections or SECTIONS:
+        if section != "suite":
+            SECTIONS[section]()
+            print()
+            continue
+
+        results = bench_suite(args.family or tuple(FAMILIES), args.lengths, args.repeat, args.strings)
+        print()
+
+        if args.output:
+            report = {
+                "created" : datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python"  : sys.version.split()[0],
+                "platform": platform.platform(),
+                "args"    : {"lengths": args.lengths, "repeat": args.repeat, "strings": args.strings},
+                "results" : results,
+            }
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as file:
+                compare(results, json.load(file)["results"])
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import struct
+from functools import lru_cache
+
+from RegexFsm.Fsm import Fsm
+from RegexFsm.lazy import MAX_STATES
+from RegexFsm.literals import Prefilter
+from RegexFsm.parser import SEMANTICS, parse
+from RegexFsm.table import VERSION
+
+
+@lru_cache(maxsize=1024)
+def compile(
+    pattern   : str,
+    minimize  : bool = True,
+    lazy      : bool = False,
+    codegen   : bool = False,
+    prefilter : bool = True,
+    cache_dir : str | None = None,
+    max_states: int = MAX_STATES
+) -> Fsm:
+    """
+        Fsm по шаблону с LRU-кешем в памяти (ключ - шаблон и параметры сборки).
+
+        Если задан cache_dir, скомпилированная таблица еще и сохраняется туда
+        в бинарном виде (FsmTable.to_bytes), и при следующем запуске процесса
+        читается с диска вместо повторной сборки. Ленивые автоматы на диск не
+        пишутся: таблицы у них нет. max_states - предел кеша состояний
+        ленивого автомата (см. LazyDfa).
+
+        Возвращаемый Fsm общий для всех, кто вызвал compile с теми же
+        аргументами, - только для чтения. count_matches(), замена prefilter
+        и т.п. видны всем остальным; для своих счетчиков нужен свой Fsm(...).
+        У автомата, прочитанного с диска, нет графа FsmNode (head=None):
+        get_all_nodes() и прочие методы графа на нем не работают.
+    """
+    if cache_dir is None or lazy:
+        return Fsm(pattern, minimize, lazy, codegen, prefilter, max_states)
+
+    #  Ключ меняется и с форматом файла (VERSION), и со смыслом шаблонов (SEMANTICS)
+    key = hashlib.sha256(repr((SEMANTICS, VERSION, pattern, minimize)).encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, f"{key}.rfsm")
+
+    try:
+        with open(path, "rb") as file:
+            fsm = Fsm.loads(file.read(), codegen)
+        #  Литералы в файл не пишутся: по дереву шаблона они считаются быстро
+        fsm.prefilter = Prefilter.from_tree(parse(pattern)) if prefilter else None
+        return fsm
+    except FileNotFoundError:
+        pass
+    except (ValueError, struct.error):
+        #  Битый или устаревший файл - пересоберем и перезапишем
+        pass
+
+    fsm = Fsm(pattern, minimize, codegen=codegen, prefilter=prefilter)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(fsm.dumps())
+    os.replace(tmp_path, path)
+
+    return fsm
@@ -0,0 +1,213 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+
+MAX_CODE = 0x10FFFF
+
+
+def merge_ranges(ranges: Iterable[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+    result: list[tuple[int, int]] = []
+
+    for lo, hi in sorted(ranges):
+        if result and lo <= result[-1][1] + 1:
+            result[-1] = (result[-1][0], max(result[-1][1], hi))
+        else:
+            result.append((lo, hi))
+
+    return tuple(result)
+
+
+def invert_ranges(ranges: tuple[tuple[int, int], ...]) -> tuple[tuple[int, int], ...]:
+    result = []
+    lo = 0
+
+    for start, end in ranges:
+        if start > lo:
+            result.append((lo, start - 1))
+        lo = end + 1
+
+    if lo <= MAX_CODE:
+        result.append((lo, MAX_CODE))
+
+    return tuple(result)
+
+
+def format_ranges(ranges: tuple[tuple[int, int], ...]) -> str:
+    """
+        ((97, 122), (48, 48)) -> "a-z0"
+    """
+    return "".join(
+        chr(lo) if lo == hi else f"{chr(lo)}-{chr(hi)}"
+        for lo, hi in ranges
+    )
+
+
+class CharSet:
+    """
+        Метка дуги НКА для класса символов: [a-z], [^...] или "." (все, кроме "\\n").
+        Хранится как отсортированные непересекающиеся диапазоны кодов.
+    """
+
+    __slots__ = ("ranges",)
+
+    def __init__(self, ranges: Iterable[tuple[int, int]], negated: bool = False) -> None:
+        ranges = merge_ranges(ranges)
+        self.ranges = invert_ranges(ranges) if negated else ranges
+
+    @classmethod
+    def parse(cls, text: str) -> "CharSet":
+        """
+            "[^a-z/]]" -> все, кроме a..z и "]". "/" экранирует следующий символ.
+        """
+        if text == ".":
+            return cls([(ord("\n"), ord("\n"))], negated=True)
+
+        body = text[1:-1]
+        negated = body.startswith("^")
+        if negated:
+            body = body[1:]
+
+        chars: list[tuple[str, bool]] = []
+        i = 0
+        while i < len(body):
+            if body[i] == "/" and i + 1 < len(body):
+                chars.append((body[i + 1], True))
+                i += 2
+            else:
+                chars.append((body[i], False))
+                i += 1
+
+        ranges = []
+        i = 0
+        while i < len(chars):
+            char = chars[i][0]
+
+            if i + 2 < len(chars) and chars[i + 1] == ("-", False):
+                last = chars[i + 2][0]
+                if ord(last) < ord(char):
+                    raise ValueError(f"Пустой диапазон {char}-{last}")
+                ranges.append((ord(char), ord(last)))
+                i += 3
+            else:
+                ranges.append((ord(char), ord(char)))
+                i += 1
+
+        return cls(ranges, negated)
+
+    def __contains__(self, char: str) -> bool:
+        code = ord(char)
+        i = bisect_right(self.ranges, (code, MAX_CODE)) - 1
+        return i >= 0 and self.ranges[i][0] <= code <= self.ranges[i][1]
+
+    def __eq__(self, other):
+        return isinstance(other, CharSet) and self.ranges == other.ranges
+
+    def __hash__(self):
+        return hash(self.ranges)
+
+    def __repr__(self):
+        inverted = invert_ranges(self.ranges)
+        if len(inverted) < len(self.ranges):
+            return f"[^{format_ranges(inverted)}]"
+        return f"[{format_ranges(self.ranges)}]"
+
+
+def label_ranges(label: str | CharSet) -> tuple[tuple[int, int], ...]:
+    if isinstance(label, str):
+        return ((ord(label), ord(label)),)
+    return label.ranges
+
+
+def label_key(label: str | CharSet):
+    """
+        Ключ сортировки меток дуг: сначала символы, потом классы.
+    """
+    if isinstance(label, str):
+        return (0, ((ord(label), ord(label)),))
+    return (1, label.ranges)
+
+
+class ClassMap:
+    """
+        Разбиение всех символов на классы эквивалентности относительно меток
+        дуг: символы одного класса неразличимы для автомата, поэтому таблица
+        переходов имеет по столбцу на класс, а не на символ.
+
+        Коды [bounds[i], bounds[i+1]) относятся к классу classes[i].
+        Класс 0 - символы, которых нет ни в одной метке.
+    """
+
+    #  Сколько символов запоминать в columns
+    memo_limit = 1 << 16
+
+    def __init__(self, bounds: list[int], classes: list[int]) -> None:
+        self.bounds = bounds
+        self.classes = classes
+        self.n_classes = max(classes, default=0) + 1
+
+        ## {char: column} для уже встречавшихся символов (ASCII - заранее)
+        self.columns: dict[str, int] = {chr(code): self.lookup(code) for code in range(128)}
+
+    @classmethod
+    def from_labels(
+        cls,
+        labels: Iterable[str | CharSet]
+    ) -> tuple["ClassMap", dict[str | CharSet, list[int]]]:
+        """
+            Построить разбиение по меткам дуг. Возвращает его и {метка: [номер класса, ...]}.
+        """
+        labels = sorted(set(labels), key=label_key)
+
+        points = {0}
+        for label in labels:
+            for lo, hi in label_ranges(label):
+                points.add(lo)
+                points.add(hi + 1)
+        points.discard(MAX_CODE + 1)
+
+        bounds = sorted(points)
+
+        ## signatures[i] = номера меток, содержащих отрезок i
+        signatures: list[list[int]] = [[] for _ in bounds]
+        covered: list[list[int]] = [[] for _ in labels]
+
+        for k, label in enumerate(labels):
+            for lo, hi in label_ranges(label):
+                i = bisect_left(bounds, lo)
+                while i < len(bounds) and bounds[i] <= hi:
+                    signatures[i].append(k)
+                    covered[k].append(i)
+                    i += 1
+
+        ids = {(): 0}
+        classes = [ids.setdefault(tuple(signature), len(ids)) for signature in signatures]
+
+        label_classes = {
+            label: sorted({classes[i] for i in covered[k]})
+            for k, label in enumerate(labels)
+        }
+
+        return cls(bounds, classes), label_classes
+
+    def lookup(self, code: int) -> int:
+        return self.classes[bisect_right(self.bounds, code) - 1]
+
+    def classify(self, char: str) -> int:
+        column = self.lookup(ord(char))
+        if len(self.columns) < self.memo_limit:
+            self.columns[char] = column
+        return column
+
+    def ranges_of(self, column: int) -> tuple[tuple[int, int], ...]:
+        bounds = self.bounds + [MAX_CODE + 1]
+        return merge_ranges(
+            (bounds[i], bounds[i + 1] - 1)
+            for i, cls in enumerate(self.classes)
+            if cls == column
+        )
+
+    def describe(self, column: int) -> str:
+        ranges = self.ranges_of(column)
+        if len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+            return chr(ranges[0][0])
+        return repr(CharSet(ranges))
@@ -0,0 +1,106 @@
+def epsilon_closures(nodes: list) -> dict:
+    """
+        {узел: frozenset узлов, достижимых из него по e-дугам (включая его самого)}.
+
+        Итеративный алгоритм Тарьяна по одним e-дугам: компоненты сильной
+        связности выходят в обратном топологическом порядке, поэтому
+        замыкание компоненты - это ее узлы плюс уже готовые замыкания
+        компонент, в которые из нее ведут e-дуги. Каждая компонента
+        считается один раз, узлы одной компоненты делят одно замыкание.
+    """
+    closures = dict()
+
+    index = dict()
+    lowlink = dict()
+    on_stack = set()
+    stack = []
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        ## [(узел, итератор по его e-соседям)]
+        work = [(root, iter(root.transitions.get(None, ())))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, neighbours = work[-1]
+
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = lowlink[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(neighbour.transitions.get(None, ()))))
+                    break
+
+                if neighbour in on_stack:
+                    lowlink[node] = min(lowlink[node], index[neighbour])
+
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] != index[node]:
+                    continue
+
+                #  node - корень компоненты: снять ее со стека
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member is node:
+                        break
+
+                closure = set(component)
+                for member in component:
+                    for neighbour in member.transitions.get(None, ()):
+                        if neighbour not in closure:
+                            closure |= closures[neighbour]
+
+                closure = frozenset(closure)
+                for member in component:
+                    closures[member] = closure
+
+    return closures
+
+
+def remove_epsilons(nodes: list) -> None:
+    """
+        Убрать e-дуги: каждый узел получает все помеченные дуги и признак
+        exitable своего e-замыкания. Дуги берутся из исходного графа, так что
+        порядок обработки узлов не важен.
+    """
+    closures = epsilon_closures(nodes)
+
+    ## {узел: {by: {to, ...}}} - только помеченные дуги, до перестройки
+    labeled = {
+        node: {by_: targets for by_, targets in node.transitions.items() if by_ is not None}
+        for node in nodes
+    }
+
+    for node in nodes:
+        closure = closures[node]
+
+        if len(closure) == 1:
+            node.transitions = dict(labeled[node])
+            continue
+
+        transitions = dict()
+        for member in closure:
+            for by_, targets in labeled[member].items():
+                if by_ in transitions:
+                    transitions[by_] |= targets
+                else:
+                    transitions[by_] = set(targets)
+
+        node.transitions = transitions
+        node.exitable = any(member.exitable for member in closure)
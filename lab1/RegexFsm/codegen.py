@@ -0,0 +1,265 @@
+import re
+from functools import lru_cache
+
+from RegexFsm.charset import merge_ranges
+from RegexFsm.table import FsmTable, DEAD, START
+
+
+#  Длиннее литерала startswith не строим: дальше выигрыша уже нет
+MAX_LITERAL = 64
+
+#  Сколько веток "if state == ..." подряд проверять на листе дерева выбора
+DISPATCH_LEAF = 4
+
+#  Глубже встраивать ветки не стоит: растет код и вложенность для compile()
+MAX_INLINE_DEPTH = 16
+
+
+def condition(ranges: tuple[tuple[int, int], ...], char: str = "c") -> str:
+    """
+        ((48, 57), (95, 95)) -> "'0' <= c <= '9' or c == '_'"
+    """
+    singles = "".join(chr(lo) for lo, hi in ranges if lo == hi)
+    parts = []
+
+    if len(singles) > 2:
+        parts.append(f"{char} in {singles!r}")
+    else:
+        parts += [f"{char} == {single!r}" for single in singles]
+
+    parts += [
+        f"{chr(lo)!r} <= {char} <= {chr(hi)!r}"
+        for lo, hi in ranges
+        if lo != hi
+    ]
+
+    return " or ".join(parts)
+
+
+def loop_pattern(ranges: tuple[tuple[int, int], ...]) -> str:
+    """
+        ((97, 122),) -> "[a-z]*"
+    """
+    return "[" + "".join(
+        re.escape(chr(lo)) + ("-" + re.escape(chr(hi)) if hi > lo else "")
+        for lo, hi in ranges
+    ) + "]*"
+
+
+class SourceBuilder:
+    """
+        Генератор исходника функции match(string) -> bool по таблице ДКА.
+
+        Каждое состояние - ветка кода: переходы зашиты сравнениями символов,
+        цепочка одиночных символов проверяется одним str.startswith, петля по
+        классу символов прокручивается re. Состояние с единственным входом
+        встраивается прямо в ветку предшественника, остальные выбираются
+        деревом сравнений "state < ..." внутри общего цикла.
+    """
+
+    def __init__(self, table: FsmTable) -> None:
+        self.table = table
+
+        ## edges[state] = {to: диапазоны кодов символов}, включая DEAD
+        self.edges = [self.collect_edges(state) for state in range(table.n_states)]
+
+        #  Сколько переходов ведет в состояние (петли и START не в счет)
+        self.indegree = [0] * table.n_states
+        self.indegree[START] += 1
+        for state in range(START, table.n_states):
+            for to in self.edges[state]:
+                if to not in (DEAD, state):
+                    self.indegree[to] += 1
+
+        #  Состояния, в которые переходят через диспетчер
+        self.dispatched: set[int] = set()
+        self.queue: list[int] = []
+
+    def collect_edges(self, state: int) -> dict[int, tuple[tuple[int, int], ...]]:
+        ## {to: [(lo, hi), ...]}
+        result: dict[int, list[tuple[int, int]]] = dict()
+
+        for column, to in enumerate(self.table.rows[state]):
+            result.setdefault(to, []).extend(self.table.classes.ranges_of(column))
+
+        #  Столбец 0 может не содержать ни одного символа (если метки покрыли все)
+        return {to: merge_ranges(ranges) for to, ranges in result.items() if ranges}
+
+    def literal_run(self, state: int) -> tuple[str, int] | None:
+        """
+            Цепочка состояний, из каждого из которых ведет ровно один символ,
+            а промежуточные не допускающие: (литерал, состояние в конце) или None.
+        """
+        literal = ""
+        visited = {state}
+
+        while len(literal) < MAX_LITERAL:
+            targets = {to: ranges for to, ranges in self.edges[state].items() if to != DEAD}
+            if len(targets) != 1:
+                break
+
+            (to, ranges), = targets.items()
+            if len(ranges) != 1 or ranges[0][0] != ranges[0][1] or to in visited:
+                break
+
+            literal += chr(ranges[0][0])
+            state = to
+            visited.add(to)
+
+            if self.table.accepting[state]:
+                break
+
+        return (literal, state) if len(literal) > 1 else None
+
+    def goto(self, to: int, depth: int) -> list[str]:
+        """
+            Код перехода в to: встроенная ветка или "state = to; continue".
+        """
+        if to == DEAD:
+            return ["return False"]
+
+        if self.indegree[to] == 1 and depth < MAX_INLINE_DEPTH:
+            return self.state_block(to, depth + 1)
+
+        if to not in self.dispatched:
+            self.dispatched.add(to)
+            self.queue.append(to)
+
+        return [f"state = {to}", "continue"]
+
+    def state_block(self, state: int, depth: int = 0) -> list[str]:
+        """
+            Код состояния state. Всегда заканчивается return или continue.
+        """
+        lines = []
+        targets = dict(self.edges[state])
+
+        loop = targets.pop(state, None)
+        if loop is not None:
+            lines.append(f"i = loop_{state}(string, i).end()")
+
+        lines += [
+            "if i == n:",
+            f"    return {bool(self.table.accepting[state])}",
+        ]
+
+        run = self.literal_run(state) if loop is None else None
+        if run is not None:
+            literal, to = run
+            return lines + [
+                f"if not string.startswith({literal!r}, i):",
+                "    return False",
+                f"i += {len(literal)}",
+            ] + self.goto(to, depth)
+
+        #  Символы петли сюда уже не дойдут
+        if loop is not None:
+            targets[DEAD] = merge_ranges(targets.get(DEAD, ()) + loop)
+
+        if list(targets) == [DEAD]:
+            return lines + ["return False"]
+
+        lines += [
+            "c = string[i]",
+            "i += 1",
+        ]
+
+        #  Самый "раздробленный" переход проверяем последним, без условия
+        default = max(targets, key=lambda to: len(targets[to]))
+
+        for to, ranges in targets.items():
+            if to != default:
+                lines.append(f"if {condition(ranges)}:")
+                lines += ["    " + line for line in self.goto(to, depth)]
+
+        return lines + self.goto(default, depth)
+
+    def dispatch(self, blocks: list[tuple[int, list[str]]], indent: str) -> list[str]:
+        """
+            Выбор ветки по номеру состояния деревом сравнений: O(log n)
+            проверок вместо длинной цепочки elif (и без глубокой вложенности,
+            на которой спотыкается compile()).
+        """
+        if len(blocks) <= DISPATCH_LEAF:
+            lines = []
+            for state, block in blocks:
+                lines.append(f"{indent}if state == {state}:")
+                lines += [f"{indent}    {line}" for line in block]
+            return lines
+
+        middle = len(blocks) // 2
+        return (
+            [f"{indent}if state < {blocks[middle][0]}:"]
+            + self.dispatch(blocks[:middle], indent + "    ")
+            + [f"{indent}else:"]
+            + self.dispatch(blocks[middle:], indent + "    ")
+        )
+
+    def build(self, name: str = "match") -> str:
+        self.dispatched = {START}
+        self.queue = [START]
+
+        ## {state: строки ветки}
+        blocks = dict()
+        while self.queue:
+            state = self.queue.pop()
+            blocks[state] = self.state_block(state)
+
+        lines = ["import re", ""]
+
+        for state in range(START, self.table.n_states):
+            loop = self.edges[state].get(state)
+            if loop is not None:
+                lines.append(f"loop_{state} = re.compile({loop_pattern(loop)!r}).match")
+
+        lines += [
+            "",
+            f"def {name}(string):",
+            "    n = len(string)",
+            "    i = 0",
+            f"    state = {START}",
+            "    while True:",
+        ]
+
+        lines += self.dispatch(sorted(blocks.items()), "        ")
+
+        return "\n".join(lines) + "\n"
+
+
+def generate_source(table: FsmTable, name: str = "match") -> str:
+    """
+        Исходник функции name(string) -> bool, см. SourceBuilder.
+    """
+    return SourceBuilder(table).build(name)
+
+
+@lru_cache(maxsize=256)
+def compile_source(source: str, name: str = "match"):
+    """
+        Скомпилировать исходник один раз (одинаковые таблицы дают одинаковый код).
+    """
+    namespace = dict()
+    exec(compile(source, f"<RegexFsm.codegen {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class CodegenMatcher:
+    """
+        Таблица ДКА плюс сгенерированная по ней функция match.
+
+        step/is_exitable/first_ranges берутся у таблицы, так что Scanner
+        работает как с обычной FsmTable.
+    """
+
+    def __init__(self, table: FsmTable) -> None:
+        self.table = table
+        self.start = table.start
+        self.step = table.step
+        self.is_exitable = table.is_exitable
+        self.first_ranges = table.first_ranges
+
+        self.source = generate_source(table)
+        self.match = compile_source(self.source)
+
+    def __repr__(self):
+        return repr(self.table)
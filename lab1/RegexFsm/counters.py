@@ -0,0 +1,90 @@
+from RegexFsm.table import FsmTable, DEAD
+
+
+class CountingMatcher:
+    """
+        Обертка над matcher'ом автомата со счетчиками match(): вызовы,
+        допущенные строки, прочитанные символы и досрочные отказы (строка
+        отвергнута раньше, чем дочитана до конца).
+
+        Включается только на время диагностики (Fsm.count_matches), поэтому
+        без нее match() ничего не платит. Если у matcher'а есть таблица,
+        match() идет по ней (FsmTable.scan), чтобы знать, где строка
+        отвергнута; у ленивого автомата символы считаются по длине строки.
+    """
+
+    def __init__(self, matcher) -> None:
+        self.matcher = matcher
+        self.table: FsmTable | None = (
+            matcher if isinstance(matcher, FsmTable) else getattr(matcher, "table", None)
+        )
+
+        self.start = matcher.start
+        self.step = matcher.step
+        self.is_exitable = matcher.is_exitable
+        self.first_ranges = matcher.first_ranges
+
+        self.calls = 0
+        self.accepted = 0
+        self.chars_scanned = 0
+        self.early_rejects = 0
+
+    def match(self, string: str) -> bool:
+        self.calls += 1
+
+        if self.table is None:
+            result = self.matcher.match(string)
+            self.chars_scanned += len(string)
+
+        else:
+            state, scanned = self.table.scan(string)
+            self.chars_scanned += scanned
+            if state == DEAD and scanned < len(string):
+                self.early_rejects += 1
+            result = bool(self.table.accepting[state])
+
+        self.accepted += result
+        return result
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "calls"            : self.calls,
+            "accepted"         : self.accepted,
+            "chars_scanned"    : self.chars_scanned,
+            "early_rejects"    : self.early_rejects,
+            "early_reject_rate": self.early_rejects / self.calls if self.calls else 0.0,
+        }
+
+    def __repr__(self):
+        return repr(self.matcher)
+
+
+class CountingPrefilter:
+    """
+        То же для Prefilter: сколько строк проверено и сколько отсеяно.
+        Включается вместе с CountingMatcher (Fsm.count_matches).
+    """
+
+    def __init__(self, prefilter) -> None:
+        self.prefilter = prefilter
+        self.checked = 0
+        self.rejected = 0
+
+    def check(self, string: str) -> bool:
+        self.checked += 1
+        result = self.prefilter.check(string)
+        self.rejected += not result
+        return result
+
+    match = check
+
+    def stats(self) -> dict:
+        return {
+            **self.prefilter.stats(),
+            "checked"    : self.checked,
+            "rejected"   : self.rejected,
+            "reject_rate": self.rejected / self.checked if self.checked else 0.0,
+        }
+
+    def __repr__(self):
+        return repr(self.prefilter)
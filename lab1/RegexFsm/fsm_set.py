@@ -0,0 +1,127 @@
+import time
+
+from RegexFsm import batch, pool
+from RegexFsm.Fsm import _Fsm, FsmNode, make_nfa
+from RegexFsm.lazy import MAX_STATES
+from RegexFsm.parser import parse
+from RegexFsm.table import FsmTable
+
+
+class FsmSet(_Fsm):
+    """
+        Набор шаблонов, собранный в один ДКА.
+
+        НКА всех шаблонов объединяются e-дугами из общего входа и
+        детерминизируются вместе; каждое состояние ДКА помечено номерами
+        шаблонов, которые в нем допускаются. match() за один проход по строке
+        возвращает номера всех подошедших шаблонов, match_many() - то же для
+        пачки строк.
+
+        finditer() и search() ищут вхождения любого из шаблонов; какого
+        именно - скажет match() на найденном куске.
+    """
+
+    def __init__(self, patterns: list[str], minimize: bool = True):
+
+        self.patterns = list(patterns)
+
+        self.timings, self.counts = dict(), dict()
+        self.prefilter = None
+        started = time.perf_counter()
+
+        self.head = FsmNode()
+        self.heads: list[FsmNode] = []
+
+        ## {id узла НКА: номер шаблона}
+        self.owners = dict()
+
+        for i, pattern in enumerate(self.patterns):
+
+            head, tail = make_nfa(parse(pattern))
+            tail.exitable = True
+
+            for node in self.get_all_nodes(head):
+                self.owners[node.id] = i
+
+            self.head.target(head, None)
+            self.heads.append(head)
+
+        self.timings["nfa"] = time.perf_counter() - started
+
+        self.optimize(minimize)
+
+        self.report_stats()
+
+    def optimize(self, minimize: bool = True, lazy: bool = False, codegen: bool = False, max_states: int = MAX_STATES):
+
+        if lazy or codegen:
+            raise ValueError(f"{self.__class__.__name__} не бывает ленивым или сгенерированным")
+
+        self.remove_e_edges()
+
+        self.removed_states = 0
+
+        #  Общий вход после удаления e-дуг допускает то же, что входы всех шаблонов
+        entry_tags = frozenset(i for i, head in enumerate(self.heads) if head.exitable)
+        entry = self.head
+
+        dfsm_states = self.determinize()
+
+        tags = {
+            dfsm_state.id: frozenset().union(*(
+                entry_tags if node is entry else (self.owners[node.id],)
+                for node in nfsm_states
+                if node.exitable
+            ))
+            for nfsm_states, dfsm_state in dfsm_states.items()
+        }
+
+        self.compile(minimize, tags)
+
+    def match(self, string: str) -> frozenset[int]:
+        """
+            Номера всех шаблонов, под которые подходит строка.
+        """
+        return self.table.tags[self.table.run(string)]
+
+    def match_patterns(self, string: str) -> list[str]:
+        return [self.patterns[i] for i in sorted(self.match(string))]
+
+    def match_many(self, strings, offsets=None) -> list[frozenset[int]]:
+        """
+            match() для пачки строк (или склеенного буфера с границами
+            offsets): все строки идут через таблицу разом, как в
+            _Fsm.match_many, конечные состояния переводятся в номера шаблонов.
+        """
+        tags = self.table.tags
+        return [tags[state] for state in batch.run_many(self.table, strings, offsets).tolist()]
+
+    def match_parallel(self, source, workers: int | None = None, **kwargs):
+        """
+            match() для файла (путь) или итерируемого из строк пулом процессов:
+            frozenset номеров шаблонов на строку в исходном порядке.
+            Метки уходят рабочим вместе с таблицей (FsmTable.to_bytes).
+        """
+        return pool.match_parallel(self.table, source, workers=workers, tagged=True, **kwargs)
+
+    @classmethod
+    def from_table(cls, table: FsmTable, patterns: list[str]) -> "FsmSet":
+        """
+            Набор из готовой таблицы с метками; patterns - те же шаблоны в
+            том же порядке, что при сборке (в таблице только их номера).
+        """
+        if table.tags is None:
+            raise ValueError("В таблице нет меток шаблонов: она собрана не FsmSet")
+
+        used = max((max(tags) for tags in table.tags if tags), default=-1)
+        if used >= len(patterns):
+            raise ValueError(f"Таблица ссылается на шаблон {used}, а передано {len(patterns)}")
+
+        fsm = super().from_table(table)
+        fsm.patterns = list(patterns)
+        fsm.heads, fsm.owners = [], dict()
+        return fsm
+
+    @classmethod
+    def loads(cls, data: bytes, patterns: list[str]) -> "FsmSet":
+        return cls.from_table(FsmTable.from_bytes(data), patterns)
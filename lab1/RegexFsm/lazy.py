@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from itertools import islice
+
+from RegexFsm.charset import ClassMap
+
+
+#  Сколько состояний ДКА ленивый автомат держит в кеше, если не сказано иное
+MAX_STATES = 4096
+
+
+class LazyDfa:
+    """
+        ДКА, который строится по требованию.
+
+        Хранится НКА без e-дуг, а состояния ДКА (множества состояний НКА)
+        создаются, когда match() впервые в них попадает, и кладутся в кеш
+        ограниченного размера с вытеснением давно не использованных.
+        Если кеш "молотит" (состояния строятся чаще, чем раз в
+        min_chars_per_state символов, и при этом вытесняются), остаток строки
+        разбирается прямой симуляцией НКА без кеширования.
+    """
+
+    def __init__(self, head, max_states: int = MAX_STATES, min_chars_per_state: int = 10) -> None:
+
+        nodes = [head]
+        ids = {head.id: 0}
+
+        i = 0
+        while i < len(nodes):
+            for by_, targets in nodes[i].transitions.items():
+                for node in targets:
+                    if node.id not in ids:
+                        ids[node.id] = len(nodes)
+                        nodes.append(node)
+            i += 1
+
+        self.classes, label_classes = ClassMap.from_labels(
+            by_
+            for node in nodes
+            for by_, targets in node.transitions.items()
+            if by_ is not None and targets
+        )
+        self.columns = self.classes.columns
+
+        ## moves[nfa_state] = {column: {to, ...}}
+        self.moves: list[dict[int, set[int]]] = []
+        for node in nodes:
+            moves = dict()
+            for by_, targets in node.transitions.items():
+                if by_ is None or not targets:
+                    continue
+                for column in label_classes[by_]:
+                    moves.setdefault(column, set()).update(ids[target.id] for target in targets)
+            self.moves.append(moves)
+        self.final: list[bool] = [node.exitable for node in nodes]
+
+        self.start = frozenset({0})
+
+        self.max_states = max_states
+        self.min_chars_per_state = min_chars_per_state
+
+        ## {nfa_states: (exitable, {column: nfa_states})}
+        self.cache: OrderedDict[
+            frozenset[int],
+            tuple[bool, dict[int, frozenset[int]]]
+        ] = OrderedDict()
+
+        self.built = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    @property
+    def n_nfa_states(self) -> int:
+        return len(self.moves)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "nfa_states": self.n_nfa_states,
+            "cached"    : len(self.cache),
+            "built"     : self.built,
+            "evictions" : self.evictions,
+            "fallbacks" : self.fallbacks,
+        }
+
+    def classify(self, char: str) -> int:
+        column = self.columns.get(char)
+        return self.classes.classify(char) if column is None else column
+
+    def successors(self, nfa_states: frozenset[int], column: int) -> frozenset[int]:
+        result = set()
+        for nfa_state in nfa_states:
+            result.update(self.moves[nfa_state].get(column, ()))
+        return frozenset(result)
+
+    def first_ranges(self) -> list[tuple[int, int]]:
+        return [
+            code_range
+            for nfa_state in self.start
+            for column in self.moves[nfa_state]
+            for code_range in self.classes.ranges_of(column)
+        ]
+
+    def is_exitable(self, nfa_states: frozenset[int]) -> bool:
+        return any(self.final[nfa_state] for nfa_state in nfa_states)
+
+    def get_state(self, nfa_states: frozenset[int]) -> tuple[bool, dict[int, frozenset[int]]]:
+        """
+            Достать состояние ДКА из кеша, либо построить его (возможно, вытеснив самое старое).
+        """
+        record = self.cache.get(nfa_states)
+
+        if record is not None:
+            self.cache.move_to_end(nfa_states)
+            return record
+
+        if len(self.cache) >= self.max_states:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+        record = (self.is_exitable(nfa_states), dict())
+        self.cache[nfa_states] = record
+        self.built += 1
+
+        return record
+
+    def step(self, nfa_states: frozenset[int], char: str) -> frozenset[int]:
+        transitions = self.get_state(nfa_states)[1]
+        column = self.classify(char)
+
+        following = transitions.get(column)
+        if following is None:
+            following = transitions[column] = self.successors(nfa_states, column)
+
+        return following
+
+    def simulate(self, nfa_states: frozenset[int], chars) -> bool:
+        """
+            Прямая симуляция НКА: ничего не кешируется, память ограничена размером НКА.
+        """
+        for char in chars:
+            nfa_states = self.successors(nfa_states, self.classify(char))
+            if not nfa_states:
+                return False
+
+        return self.is_exitable(nfa_states)
+
+    def match(self, string: str) -> bool:
+
+        built, evictions = self.built, self.evictions
+
+        current = self.start
+        exitable, transitions = self.get_state(current)
+
+        for i, char in enumerate(string):
+            column = self.classify(char)
+            following = transitions.get(column)
+
+            if following is None:
+                following = transitions[column] = self.successors(current, column)
+
+            if not following:
+                return False
+
+            current = following
+            exitable, transitions = self.get_state(current)
+
+            if (
+                self.evictions > evictions
+                and (self.built - built) * self.min_chars_per_state > i + 1
+            ):
+                self.fallbacks += 1
+                return self.simulate(current, islice(string, i + 1, None))
+
+        return exitable
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.n_nfa_states} NFA states, "
+            + f"{len(self.cache)}/{self.max_states} DFA states cached)"
+        )
@@ -0,0 +1,196 @@
+from os.path import commonprefix
+from typing import NamedTuple
+
+from RegexFsm.parser import Char, Class, Group, Repeat, Node
+
+
+#  Больше вариантов точного множества строк не перебираем
+MAX_EXACT = 16
+
+#  Длиннее литералы обрезаем: проверка "in" дальше не ускоряется
+MAX_LITERAL = 256
+
+#  Короче суффикс (и больше ничего) не отсеивает: на последнем символе
+#  автомат откажет и сам, а вызов check() дороже
+MIN_SUFFIX = 2
+
+
+class Literals(NamedTuple):
+    """
+        Что известно о любой строке, которую допускает узел дерева.
+
+        exact  - все такие строки (если их немного), иначе None
+        prefix - с чего каждая из них начинается
+        suffix - чем каждая заканчивается
+        inner  - подстроки, которые есть в каждой
+    """
+    exact : frozenset[str] | None
+    prefix: str
+    suffix: str
+    inner : frozenset[str]
+
+
+UNKNOWN = Literals(None, "", "", frozenset())
+EMPTY = Literals(frozenset({""}), "", "", frozenset())
+
+
+def commonsuffix(strings: list[str]) -> str:
+    return commonprefix([string[::-1] for string in strings])[::-1]
+
+
+def from_exact(exact: frozenset[str]) -> Literals:
+    strings = list(exact)
+    prefix, suffix = commonprefix(strings), commonsuffix(strings)
+    return Literals(exact, prefix, suffix, frozenset({prefix, suffix}))
+
+
+def concat(left: Literals, right: Literals) -> Literals:
+    """
+        Литералы последовательности "left right".
+    """
+    if left.exact is not None and right.exact is not None and len(left.exact) * len(right.exact) <= MAX_EXACT:
+        exact = frozenset(a + b for a in left.exact for b in right.exact)
+        if all(len(string) <= MAX_LITERAL for string in exact):
+            return from_exact(exact)
+
+    #  Левая часть целиком известна - ее строка продолжает префикс правой
+    if left.exact is not None and len(left.exact) == 1:
+        prefix = left.prefix + right.prefix
+    else:
+        prefix = left.prefix
+
+    if right.exact is not None and len(right.exact) == 1:
+        suffix = left.suffix + right.suffix
+    else:
+        suffix = right.suffix
+
+    #  На стыке конец левой части и начало правой дают одну подстроку
+    inner = left.inner | right.inner | {left.suffix + right.prefix}
+
+    return Literals(
+        None,
+        prefix[:MAX_LITERAL],
+        suffix[-MAX_LITERAL:],
+        frozenset(literal[:MAX_LITERAL] for literal in inner),
+    )
+
+
+def alternation(options: list[Literals]) -> Literals:
+    """
+        Литералы "a|b|...": общее для всех вариантов.
+    """
+    if all(option.exact is not None for option in options):
+        exact = frozenset().union(*(option.exact for option in options))
+        if len(exact) <= MAX_EXACT:
+            return from_exact(exact)
+
+    prefix = commonprefix([option.prefix for option in options])
+    suffix = commonsuffix([option.suffix for option in options])
+    inner = frozenset.intersection(*(option.inner for option in options))
+
+    return Literals(None, prefix, suffix, inner | {prefix, suffix})
+
+
+def repeat(node: Literals, low: int, high: int | None) -> Literals:
+    """
+        Литералы "node{low,high}".
+    """
+    if low == 0:
+        if high == 1 and node.exact is not None:
+            return alternation([EMPTY, node])
+        return EMPTY if high == 0 else UNKNOWN
+
+    result = node
+    for _ in range(low - 1):
+        result = concat(result, node)
+
+    if high == low:
+        return result
+
+    #  Хвост повторений неизвестной длины, но кончается все равно на node
+    return Literals(None, result.prefix, node.suffix, result.inner)
+
+
+def literals(node: Node) -> Literals:
+    if isinstance(node, Char):
+        return from_exact(frozenset({node.char}))
+
+    if isinstance(node, Class):
+        ranges = node.charset.ranges
+        if sum(hi - lo + 1 for lo, hi in ranges) <= MAX_EXACT:
+            return from_exact(frozenset(chr(code) for lo, hi in ranges for code in range(lo, hi + 1)))
+        return UNKNOWN
+
+    if isinstance(node, Repeat):
+        return repeat(literals(node.node), node.low, node.high)
+
+    options = []
+    for alternative in node.alternatives:
+        result = EMPTY
+        for item in alternative:
+            result = concat(result, literals(item))
+        options.append(result)
+
+    return alternation(options)
+
+
+class Prefilter:
+    """
+        Быстрый отсев строк до запуска автомата: строка, допускаемая
+        шаблоном, обязана кончаться на suffix и содержать каждый литерал из
+        inner. Проверки - str.endswith и "in", обе на C, против шага
+        автомата на символ.
+
+        Обязательный префикс не проверяется: на нем автомат и сам
+        отказывает с первого же несовпавшего символа, а лишняя проверка
+        на каждой строке только замедляет match().
+
+        Ответ "нет" окончательный, "да" - только повод запустить автомат.
+        Счетчиков здесь нет, их добавляет CountingPrefilter (Fsm.count_matches).
+    """
+
+    def __init__(self, suffix: str, inner: tuple[str, ...]) -> None:
+        self.suffix = suffix
+        self.inner = inner
+
+    @classmethod
+    def from_tree(cls, tree: Group) -> "Prefilter | None":
+        """
+            Prefilter по дереву шаблона или None, если отсеивать нечем.
+        """
+        found = literals(tree)
+
+        #  Литералы, которые уже входят в другие (или в prefix/suffix), лишние
+        candidates = sorted(found.inner | {found.suffix}, key=len, reverse=True)
+        inner = []
+        for literal in candidates:
+            if literal and not any(literal in longer for longer in [found.prefix, found.suffix, *inner]):
+                inner.append(literal)
+
+        #  Суффикс, целиком лежащий в префиксе, автомат тоже проверит сам
+        suffix = "" if found.suffix in found.prefix else found.suffix
+
+        if not inner and len(suffix) < MIN_SUFFIX:
+            return None
+
+        return cls(suffix, tuple(inner))
+
+    def check(self, string: str) -> bool:
+        if not string.endswith(self.suffix):
+            return False
+        for literal in self.inner:
+            if literal not in string:
+                return False
+        return True
+
+    #  Чтобы отсев прогонять пачкой через batch.match_each, как matcher
+    match = check
+
+    def stats(self) -> dict:
+        return {
+            "suffix": self.suffix,
+            "inner" : list(self.inner),
+        }
+
+    def __repr__(self):
+        return f"Prefilter(suffix={self.suffix!r}, inner={self.inner!r})"
@@ -0,0 +1,97 @@
+from array import array
+
+from RegexFsm.table import FsmTable, DEAD, START
+
+
+def hopcroft(table: FsmTable) -> FsmTable:
+    """
+        Минимизация ДКА алгоритмом Хопкрофта (уточнение разбиения).
+
+        Таблица полна (недостающие переходы ведут в DEAD), поэтому состояния,
+        из которых нельзя дойти до допускающего, склеиваются с мертвым.
+        Если у таблицы есть tags, склеиваются только состояния с одинаковыми tags.
+    """
+    n, width, rows = table.n_states, table.width, table.rows
+
+    ## inverse[column][to] = [from, ...]
+    inverse = [[[] for _ in range(n)] for _ in range(width)]
+    for state in range(n):
+        for column, to in enumerate(rows[state]):
+            inverse[column][to].append(state)
+
+    ## {метка: состояния}
+    initial: dict = {}
+    for state in range(n):
+        label = table.tags[state] if table.tags is not None else table.accepting[state]
+        initial.setdefault(label, set()).add(state)
+
+    blocks = list(initial.values())
+    block_of = [0] * n
+    for i, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = i
+
+    work = set(range(len(blocks)))
+
+    while work:
+        splitter = blocks[work.pop()]
+
+        for column in range(width):
+            predecessors = {
+                state
+                for to in splitter
+                for state in inverse[column][to]
+            }
+
+            touched: dict[int, set[int]] = {}
+            for state in predecessors:
+                touched.setdefault(block_of[state], set()).add(state)
+
+            for i, inside in touched.items():
+                if len(inside) == len(blocks[i]):
+                    continue
+
+                outside = blocks[i] - inside
+                big, small = (inside, outside) if len(inside) >= len(outside) else (outside, inside)
+
+                blocks[i] = big
+                blocks.append(small)
+                for state in small:
+                    block_of[state] = len(blocks) - 1
+
+                work.add(len(blocks) - 1)
+
+    #  Мертвый блок остается нулевым, стартовый - первым, остальные нумеруем обходом в ширину.
+    new_ids = {block_of[DEAD]: DEAD}
+    order = [DEAD]
+
+    if block_of[START] in new_ids:
+        #  Язык пуст: стартовое состояние эквивалентно мертвому, но START все равно должен быть.
+        order.append(DEAD)
+    else:
+        new_ids[block_of[START]] = START
+        order.append(START)
+
+        i = START
+        while i < len(order):
+            for to in rows[order[i]]:
+                if block_of[to] not in new_ids:
+                    new_ids[block_of[to]] = len(order)
+                    order.append(to)
+            i += 1
+
+    transitions = array("i", bytes(4 * width * len(order)))
+    accepting_flags = bytearray(len(order))
+    tags = None if table.tags is None else [frozenset()] * len(order)
+
+    for state, representative in enumerate(order):
+        if state == DEAD:
+            continue
+
+        accepting_flags[state] = table.accepting[representative]
+        if tags is not None:
+            tags[state] = table.tags[representative]
+        for column, to in enumerate(rows[representative]):
+            transitions[state * width + column] = new_ids[block_of[to]]
+
+    return FsmTable(table.classes, transitions, accepting_flags, tags)
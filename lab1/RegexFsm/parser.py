@@ -0,0 +1,228 @@
+from typing import NamedTuple, Union
+
+from RegexFsm.charset import CharSet
+
+
+class TemplateError(Exception):
+    def __init__(self, template, i):
+        err_pos = i * " " + " ^"
+        message = (
+            f"{self.__class__.__name__}: Кривой шаблон в позиции {i}\n"
+            + f"'{template}'"
+            + "\n"
+            + err_pos
+        )
+
+        super().__init__(message)
+
+
+class Char(NamedTuple):
+    pos : int
+    char: str
+
+
+class Class(NamedTuple):
+    pos    : int
+    charset: CharSet
+
+
+class Group(NamedTuple):
+    """
+        (...): альтернативы, каждая - последовательность узлов.
+        Весь шаблон - тоже группа (pos=0).
+    """
+    pos         : int
+    alternatives: list[list["Node"]]
+
+
+class Repeat(NamedTuple):
+    """
+        node{low,high}, high=None - без верхней границы. pos - начало node.
+    """
+    pos : int
+    node: "Node"
+    low : int
+    high: int | None
+
+
+Node = Union[Char, Class, Group, Repeat]
+
+
+## {оператор: (low, high)}
+REPEATS = {
+    "*": (0, None),
+    "+": (1, None),
+    "?": (0, 1),
+}
+
+#  "." - любой символ, кроме перевода строки
+ANY = CharSet.parse(".")
+
+#  Шаблоны приходят от пользователей: a{100000000} не должен строить 10^8
+#  узлов. Предел на число в {m,n} и на размер шаблона после раскрытия всех
+#  повторов (вложенные повторы перемножаются)
+MAX_REPEAT = 1000
+MAX_EXPANDED = 100_000
+
+#  Версия смысла шаблонов: входит в ключ дискового кеша (cache.compile).
+#  Увеличивать в том же коммите, что меняет разбор (как "." стала любым
+#  символом), иначе с диска прочитается таблица старого шаблона
+SEMANTICS = 1
+
+
+def class_end(pattern: str, i: int) -> int:
+    """
+        Позиция "]", закрывающей класс, открытый в pattern[i] == "[".
+    """
+    j = i + 1
+    while j < len(pattern) and pattern[j] != "]":
+        j += 2 if pattern[j] == "/" else 1
+
+    if j >= len(pattern):
+        raise TemplateError(pattern, i)
+
+    return j
+
+
+def digits_end(pattern: str, i: int) -> int:
+    """
+        Позиция первой не-цифры в pattern, начиная с i.
+    """
+    while i < len(pattern) and "0" <= pattern[i] <= "9":
+        i += 1
+    return i
+
+
+def bounds_end(pattern: str, i: int) -> tuple[int, int | None, int] | None:
+    """
+        "{m}", "{m,}" или "{m,n}" с pattern[i] == "{": (low, high, позиция "}").
+        None, если это не квантификатор - тогда "{" обычный символ.
+
+        Разбор идет от i и обрывается на первом лишнем символе: искать "}"
+        по всему хвосту шаблона на каждую буквальную "{" - квадрат.
+    """
+    comma = digits_end(pattern, i + 1)
+    if comma == i + 1:
+        return None
+    low = int(pattern[i + 1:comma])
+
+    if comma < len(pattern) and pattern[comma] == "}":
+        return low, low, comma
+
+    if comma >= len(pattern) or pattern[comma] != ",":
+        return None
+
+    j = digits_end(pattern, comma + 1)
+    if j >= len(pattern) or pattern[j] != "}":
+        return None
+
+    return low, int(pattern[comma + 1:j]) if j > comma + 1 else None, j
+
+
+def expanded_size(node: Node, sizes: dict[int, int]) -> int:
+    """
+        Сколько символов и классов в node после раскрытия повторов.
+        sizes - {id группы: ее размер} для уже закрытых групп.
+    """
+    if isinstance(node, Group):
+        return sizes[id(node)]
+    if isinstance(node, Repeat):
+        return expanded_size(node.node, sizes) * max(node.low, node.high or 1)
+    return 1
+
+
+def group_size(group: Group, sizes: dict[int, int]) -> int:
+    return max(sum(expanded_size(item, sizes) for item in alternative) for alternative in group.alternatives)
+
+
+def parse(pattern: str) -> Group:
+    """
+        Шаблон -> дерево за один проход, без рекурсии.
+
+        "/" экранирует следующий символ, "[...]" и "." - классы символов,
+        "*+?" и "{m}", "{m,}", "{m,n}" относятся к предыдущему символу,
+        классу или группе.
+        Любая ошибка (в т.ч. несбалансированные скобки) - TemplateError
+        с позицией в шаблоне; слишком большие повторы (MAX_REPEAT,
+        MAX_EXPANDED) - тоже.
+    """
+    root = Group(0, [[]])
+
+    #  Открытые группы, последняя - текущая
+    stack = [root]
+
+    ## {id закрытой группы: размер после раскрытия повторов}
+    sizes = dict()
+
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        items = stack[-1].alternatives[-1]
+
+        if char == "/":
+            if i + 1 == len(pattern):
+                raise TemplateError(pattern, i)
+            items.append(Char(i, pattern[i + 1]))
+            i += 2
+            continue
+
+        if char == "[":
+            j = class_end(pattern, i)
+            try:
+                items.append(Class(i, CharSet.parse(pattern[i:j + 1])))
+            except ValueError:
+                raise TemplateError(pattern, i)
+            i = j + 1
+            continue
+
+        bounds = bounds_end(pattern, i) if char == "{" else None
+
+        if char == ".":
+            items.append(Class(i, ANY))
+
+        elif char == "(":
+            group = Group(i, [[]])
+            items.append(group)
+            stack.append(group)
+
+        elif char == ")":
+            if len(stack) == 1:
+                raise TemplateError(pattern, i)
+            group = stack.pop()
+            sizes[id(group)] = group_size(group, sizes)
+            if sizes[id(group)] > MAX_EXPANDED:
+                raise TemplateError(pattern, group.pos)
+
+        elif char == "|":
+            stack[-1].alternatives.append([])
+
+        elif char in REPEATS or bounds is not None:
+            #  Оператору нужен операнд, и два оператора подряд нельзя
+            if not items or isinstance(items[-1], Repeat):
+                raise TemplateError(pattern, i)
+
+            if bounds is not None:
+                low, high, end = bounds
+                if high is not None and high < low or max(low, high or 0) > MAX_REPEAT:
+                    raise TemplateError(pattern, i)
+            else:
+                low, high = REPEATS[char]
+                end = i
+
+            items[-1] = Repeat(items[-1].pos, items[-1], low, high)
+            if expanded_size(items[-1], sizes) > MAX_EXPANDED:
+                raise TemplateError(pattern, i)
+            i = end
+
+        else:
+            items.append(Char(i, char))
+
+        i += 1
+
+    if len(stack) > 1:
+        raise TemplateError(pattern, stack[-1].pos)
+
+    if group_size(root, sizes) > MAX_EXPANDED:
+        raise TemplateError(pattern, 0)
+
+    return root
@@ -0,0 +1,136 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator
+
+from RegexFsm.table import FsmTable
+from RegexFsm.codegen import CodegenMatcher
+
+
+#  Разбор строки в рабочем процессе и упаковка ответа на кусок,
+#  задаются один раз в initializer
+_match = None
+_pack = bytes
+
+
+def _init_worker(data: bytes, codegen: bool, tagged: bool = False) -> None:
+    global _match, _pack
+
+    table = FsmTable.from_bytes(data)
+
+    if tagged:
+        #  Набор шаблонов (FsmSet): номера подошедших шаблонов на строку
+        _match = lambda string: table.tags[table.run(string)]
+        _pack = list
+    else:
+        _match = (CodegenMatcher(table) if codegen else table).match
+        _pack = bytes
+
+
+def _match_strings(strings: list[str]):
+    return _pack(map(_match, strings))
+
+
+def _match_range(path: str, start: int, end: int, encoding: str) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+
+    lines = text.replace("\r\n", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+
+    return _pack(map(_match, lines))
+
+
+def file_ranges(path: str, chunk_bytes: int) -> Iterator[tuple[int, int]]:
+    """
+        Разрезать файл на куски примерно по chunk_bytes байт по границам строк.
+    """
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as file:
+        start = 0
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                file.seek(end)
+                end += len(file.readline())
+
+            yield start, end
+            start = end
+
+
+def match_chunks(
+    table      : FsmTable,
+    source     : str | os.PathLike | Iterable[str],
+    workers    : int | None = None,
+    chunk_size : int = 10_000,
+    chunk_bytes: int = 1 << 20,
+    encoding   : str = "utf-8",
+    codegen    : bool = False,
+    tagged     : bool = False
+) -> Iterator[bytes | list[frozenset[int]]]:
+    """
+        Разобрать строки пулом процессов, отдавая результаты кусками
+        (bytes, по байту 0/1 на строку) в исходном порядке. С tagged -
+        куски из frozenset номеров шаблонов (таблица FsmSet, с tags).
+
+        source - путь к файлу (строки через "\\n"; рабочие сами читают свои
+        диапазоны байтов, главный процесс строк не трогает) либо итерируемое
+        из строк (режется на списки по chunk_size и пересылается рабочим).
+
+        Каждый рабочий получает автомат один раз, при старте, в виде
+        FsmTable.to_bytes(). Одновременно в работе не больше 4 кусков на
+        рабочего, так что память не растет на бесконечном входе.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        tasks = (
+            (_match_range, path, start, end, encoding)
+            for start, end in file_ranges(path, chunk_bytes)
+        )
+    else:
+        strings = iter(source)
+        tasks = (
+            (_match_strings, chunk)
+            for chunk in iter(lambda: list(islice(strings, chunk_size)), [])
+        )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(table.to_bytes(), codegen, tagged)
+    ) as executor:
+
+        pending = deque()
+
+        try:
+            for func, *args in tasks:
+                pending.append(executor.submit(func, *args))
+
+                if len(pending) >= 4 * workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+        finally:
+            #  Потребитель бросил итерацию (или ошибка) - лишнее не досчитываем
+            for future in pending:
+                future.cancel()
+
+
+def match_parallel(table: FsmTable, source, tagged: bool = False, **kwargs) -> Iterator[bool | frozenset[int]]:
+    """
+        То же, что match_chunks, но по одному ответу на строку: bool или,
+        с tagged, frozenset номеров шаблонов.
+    """
+    for chunk in match_chunks(table, source, tagged=tagged, **kwargs):
+        if tagged:
+            yield from chunk
+        else:
+            yield from map(bool, chunk)
@@ -0,0 +1,213 @@
+import codecs
+import re
+import time
+from typing import Iterator, NamedTuple
+
+
+class Match(NamedTuple):
+    start: int
+    end  : int
+    group: str
+
+
+def iter_chunks(source, chunk_size: int = 1 << 16, encoding: str = "utf-8") -> Iterator[str]:
+    """
+        Привести вход к потоку строковых кусков.
+
+        source - str, bytes-подобный объект (в т.ч. mmap), файловый объект
+        (текстовый или бинарный) или итерируемое из str/bytes кусков.
+        Байты декодируются инкрементально, так что многобайтовый символ
+        может быть разрезан границей куска.
+    """
+    if isinstance(source, str):
+        yield source
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+
+    if hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    elif isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, "madvise"):
+        view = memoryview(source)
+        chunks = (view[i:i + chunk_size] for i in range(0, len(view), chunk_size))
+    else:
+        chunks = source
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            yield chunk
+        else:
+            yield decoder.decode(chunk)
+
+    yield decoder.decode(b"", final=True)
+
+
+class Scanner:
+    """
+        Поиск непересекающихся вхождений шаблона в потоке: самое левое,
+        из самых левых - самое длинное.
+
+        matcher - FsmTable или LazyDfa: нужны start, step(state, char) и
+        is_exitable(state); мертвое состояние ложно (0 или пустое множество).
+
+        Состояние разбора (живые "нити" {состояние ДКА: позиция начала})
+        переживает границы кусков, а в памяти держится только хвост входа от
+        начала самой ранней живой нити. Позиции - в символах от начала потока.
+    """
+
+    def __init__(self, matcher, chunk_size: int = 1 << 16, encoding: str = "utf-8") -> None:
+        self.matcher = matcher
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+        #  Пока живых нитей нет, символы, с которых совпадение начаться не
+        #  может, пропускаются поиском re вместо шагов автомата.
+        first_ranges = matcher.first_ranges()
+        self.skip = None
+        if first_ranges and not matcher.is_exitable(matcher.start):
+            self.skip = re.compile(
+                "["
+                + "".join(
+                    re.escape(chr(lo)) + ("-" + re.escape(chr(hi)) if hi > lo else "")
+                    for lo, hi in first_ranges
+                )
+                + "]"
+            ).search
+
+        #  Счетчики для оценки объема работы
+        self.chunks = 0
+        self.chars_read = 0
+        self.chars_scanned = 0
+        self.matches = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+            Прочитанных символов в секунду (без учета времени потребителя).
+        """
+        return self.chars_read / self.elapsed if self.elapsed else 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "chunks"       : self.chunks,
+            "chars_read"   : self.chars_read,
+            "chars_scanned": self.chars_scanned,
+            "matches"      : self.matches,
+            "elapsed"      : self.elapsed,
+            "throughput"   : self.throughput,
+        }
+
+    def finditer(self, source) -> Iterator[Match]:
+
+        self.buffer = ""
+        self.base = 0
+        self.pos = 0
+        self.threads: dict = {}
+        self.best: tuple[int, int] | None = None
+
+        for chunk in iter_chunks(source, self.chunk_size, self.encoding):
+            if not chunk:
+                continue
+
+            self.chunks += 1
+            self.chars_read += len(chunk)
+            self.buffer += chunk
+
+            yield from self._scan(final=False)
+
+        yield from self._scan(final=True)
+
+    def search(self, source) -> Match | None:
+        return next(self.finditer(source), None)
+
+    def _scan(self, final: bool) -> list[Match]:
+        started = time.perf_counter()
+
+        matcher = self.matcher
+        step, is_exitable, start_state = matcher.step, matcher.is_exitable, matcher.start
+        start_exitable = is_exitable(start_state)
+
+        buffer, base = self.buffer, self.base
+        pos, threads, best = self.pos, self.threads, self.best
+        end = base + len(buffer)
+
+        skip = self.skip
+
+        found = []
+        scanned = 0
+
+        while True:
+
+            while pos < end:
+
+                if skip is not None and not threads and best is None:
+                    candidate = skip(buffer, pos - base)
+                    if candidate is None:
+                        pos = end
+                        break
+                    pos = base + candidate.start()
+
+                #  Пока кандидата нет, с каждой позиции стартует новая нить
+                if best is None and start_state not in threads:
+                    threads[start_state] = pos
+                    if start_exitable:
+                        best = (pos, pos)
+
+                char = buffer[pos - base]
+                following = {}
+
+                for state, start in threads.items():
+                    state = step(state, char)
+                    if state and start < following.get(state, pos + 1):
+                        following[state] = start
+
+                threads = following
+                pos += 1
+                scanned += 1
+
+                for state, start in threads.items():
+                    if is_exitable(state) and (
+                        best is None
+                        or start < best[0]
+                        or (start == best[0] and pos > best[1])
+                    ):
+                        best = (start, pos)
+
+                if best is not None:
+                    threads = {state: start for state, start in threads.items() if start <= best[0]}
+
+                    if not threads:
+                        found.append(Match(best[0], best[1], buffer[best[0] - base:best[1] - base]))
+                        pos = best[1] if best[1] > best[0] else best[0] + 1
+                        best = None
+
+            if not final:
+                break
+
+            #  Вход кончился: живые нити уже не продлятся
+            threads = {}
+
+            if best is not None:
+                found.append(Match(best[0], best[1], buffer[best[0] - base:best[1] - base]))
+                pos = best[1] if best[1] > best[0] else best[0] + 1
+                best = None
+
+                if pos <= end:
+                    continue
+
+            elif start_exitable and pos == end:
+                found.append(Match(end, end, ""))
+
+            break
+
+        #  Все, что левее самой ранней нужной позиции, больше не понадобится
+        keep = min([pos, *threads.values(), *(best[:1] if best else ())])
+        self.buffer, self.base = buffer[keep - base:], keep
+        self.pos, self.threads, self.best = pos, threads, best
+
+        self.chars_scanned += scanned
+        self.matches += len(found)
+        self.elapsed += time.perf_counter() - started
+
+        return found
@@ -0,0 +1,304 @@
+import struct
+import sys
+from array import array
+
+from RegexFsm.charset import ClassMap
+
+
+#  Номер "мертвого" состояния: из него никуда не выйти и в нем нельзя завершиться.
+DEAD  = 0
+#  Номер начального состояния.
+START = 1
+
+#  Заголовок бинарного формата: магия, версия, флаги, n_states, width, число границ классов.
+HEADER = struct.Struct("<4sHHIII")
+MAGIC = b"RFSM"
+VERSION = 2
+HAS_TAGS = 1
+
+
+class FsmTable:
+    """
+        Скомпилированный ДКА.
+
+        Состояния пронумерованы целыми числами (0 - мертвое, 1 - начальное),
+        столбцы - классы эквивалентности символов (0 - символы не из алфавита).
+        Переходы хранятся плотной матрицей n_states x width в array('i'),
+        допускающие состояния - флагами в bytearray.
+    """
+
+    start = START
+
+    def __init__(
+        self,
+        classes    : ClassMap,
+        transitions: array,
+        accepting  : bytearray,
+        tags       : list[frozenset[int]] | None = None
+    ) -> None:
+
+        self.classes = classes
+        self.width = classes.n_classes
+
+        ## {char: column}, дополняется по ходу разбора
+        self.columns = classes.columns
+
+        self.transitions = transitions
+        self.accepting = accepting
+
+        #  Для набора шаблонов: номера шаблонов, допускаемых в каждом состоянии
+        self.tags = tags
+
+        #  Та же матрица, порезанная на строки-списки: индексирование списка
+        #  дешевле, чем array (не нужно заново создавать объект int).
+        self.rows: list[list[int]] = [
+            transitions[i:i + self.width].tolist()
+            for i in range(0, len(transitions), self.width)
+        ]
+
+        #  Флаги допускающих состояний списком bool: match() отдает их как есть
+        self.final: list[bool] = [bool(flag) for flag in accepting]
+
+        self.match = self.make_match()
+
+    @property
+    def n_states(self) -> int:
+        return len(self.accepting)
+
+    @classmethod
+    def from_nodes(cls, head, classes: ClassMap, tags: dict | None = None) -> "FsmTable":
+        """
+            Собрать таблицу по графу детерминированных FsmNode, дуги которого
+            помечены номерами классов из classes.
+            tags - {id узла: frozenset номеров шаблонов}, см. FsmSet.
+        """
+        nodes = [head]
+        ids = {head.id: START}
+
+        i = 0
+        while i < len(nodes):
+            for by_ in nodes[i].transitions:
+                for node in nodes[i].transitions[by_]:
+                    if node.id not in ids:
+                        ids[node.id] = len(nodes) + START
+                        nodes.append(node)
+            i += 1
+
+        width = classes.n_classes
+
+        transitions = array("i", bytes(4 * width * (len(nodes) + START)))
+        accepting = bytearray(len(nodes) + START)
+
+        for node in nodes:
+            state = ids[node.id]
+            accepting[state] = node.exitable
+
+            for by_ in node.transitions:
+                transitions[state * width + by_] = ids[next(iter(node.transitions[by_])).id]
+
+        if tags is not None:
+            tags = [frozenset()] + [tags[node.id] for node in nodes]
+
+        return cls(classes, transitions, accepting, tags)
+
+    def to_bytes(self) -> bytes:
+        """
+            Плоский бинарный формат: заголовок, границы классов и их номера (uint32),
+            матрица переходов int32 little-endian, флаги допускающих состояний
+            и, если есть, tags (число меток на состояние, затем сами метки, uint32).
+        """
+        bounds = array("I", self.classes.bounds)
+        classes = array("I", self.classes.classes)
+
+        transitions = array("i", self.transitions)
+        if sys.byteorder == "big":
+            for arr in (bounds, classes, transitions):
+                arr.byteswap()
+
+        parts = [
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                HAS_TAGS if self.tags is not None else 0,
+                self.n_states,
+                self.width,
+                len(bounds)
+            ),
+            bounds.tobytes(),
+            classes.tobytes(),
+            transitions.tobytes(),
+            bytes(self.accepting),
+        ]
+
+        if self.tags is not None:
+            counts = array("I", [len(tags) for tags in self.tags])
+            labels = array("I", [label for tags in self.tags for label in sorted(tags)])
+            if sys.byteorder == "big":
+                counts.byteswap()
+                labels.byteswap()
+            parts += [counts.tobytes(), labels.tobytes()]
+
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FsmTable":
+
+        magic, version, flags, n_states, width, n_bounds = HEADER.unpack_from(data)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Не скомпилированный автомат (или другая версия формата): {magic!r} v{version}")
+
+        offset = HEADER.size
+
+        bounds = array("I")
+        bounds.frombytes(data[offset:offset + 4 * n_bounds])
+        offset += 4 * n_bounds
+
+        classes = array("I")
+        classes.frombytes(data[offset:offset + 4 * n_bounds])
+        offset += 4 * n_bounds
+
+        transitions = array("i")
+        transitions.frombytes(data[offset:offset + 4 * n_states * width])
+        offset += 4 * n_states * width
+
+        accepting = bytearray(data[offset:offset + n_states])
+        offset += n_states
+
+        tags = None
+        if flags & HAS_TAGS:
+            counts = array("I")
+            counts.frombytes(data[offset:offset + 4 * n_states])
+            offset += 4 * n_states
+
+            labels = array("I")
+            labels.frombytes(data[offset:offset + 4 * sum(counts)])
+
+            if sys.byteorder == "big":
+                counts.byteswap()
+                labels.byteswap()
+
+            tags, i = [], 0
+            for count in counts:
+                tags.append(frozenset(labels[i:i + count]))
+                i += count
+
+        if sys.byteorder == "big":
+            for arr in (bounds, classes, transitions):
+                arr.byteswap()
+
+        return cls(ClassMap(bounds.tolist(), classes.tolist()), transitions, accepting, tags)
+
+    def step(self, state: int, char: str) -> int:
+        column = self.columns.get(char)
+        if column is None:
+            column = self.classes.classify(char)
+        return self.rows[state][column]
+
+    def is_exitable(self, state: int) -> bool:
+        return bool(self.accepting[state])
+
+    def first_ranges(self) -> list[tuple[int, int]]:
+        """
+            Диапазоны кодов символов, с которых может начинаться непустое совпадение.
+        """
+        return [
+            code_range
+            for column, to in enumerate(self.rows[START])
+            if to != DEAD
+            for code_range in self.classes.ranges_of(column)
+        ]
+
+    def make_match(self):
+        """
+            match(string) -> bool: то же, что accepting[run(string)], но без
+            лишних вызовов. На миллионах коротких строк цена вызова сравнима
+            с самим разбором, поэтому rows/columns/final привязаны к замыканию
+            аргументами по умолчанию - внутри нет ни одного обращения к self.
+        """
+        run = self.run
+
+        def match(string: str, rows=self.rows, columns=self.columns, final=self.final) -> bool:
+            state = START
+            try:
+                for char in string:
+                    state = rows[state][columns[char]]
+                    if not state:
+                        #  DEAD == 0
+                        return False
+            except KeyError:
+                #  Символа еще нет в columns (не ASCII) - заново, через classify
+                state = run(string)
+            return final[state]
+
+        return match
+
+    def run(self, string: str) -> int:
+        """
+            Прогнать строку по таблице и вернуть конечное состояние.
+        """
+        rows = self.rows
+        columns = self.columns
+        classify = self.classes.classify
+        state = START
+
+        for char in string:
+            try:
+                column = columns[char]
+            except KeyError:
+                column = classify(char)
+
+            state = rows[state][column]
+            if state == DEAD:
+                return DEAD
+
+        return state
+
+    def scan(self, string: str) -> tuple[int, int]:
+        """
+            То же, что run, но вернуть еще и число прочитанных символов
+            (меньше длины строки, если она отвергнута досрочно).
+        """
+        rows = self.rows
+        columns = self.columns
+        classify = self.classes.classify
+        state = START
+
+        for i, char in enumerate(string):
+            try:
+                column = columns[char]
+            except KeyError:
+                column = classify(char)
+
+            state = rows[state][column]
+            if state == DEAD:
+                return DEAD, i + 1
+
+        return state, len(string)
+
+    def __repr__(self):
+
+        result = [
+            f"{self.__class__.__name__}({self.n_states - START} states, {self.width} symbol classes)",
+            "From\tTo\tBy\tExitable"
+        ]
+
+        for state in range(START, self.n_states):
+            exitable = ("", "*")[self.accepting[state]]
+            if self.tags is not None and self.tags[state]:
+                exitable += ",".join(map(str, sorted(self.tags[state])))
+            targets = [
+                (column, to)
+                for column, to in enumerate(self.rows[state])
+                if to != DEAD
+            ]
+
+            if not targets:
+                result.append("\t".join([str(state - START), "", "None", exitable]))
+
+            for column, to in targets:
+                result.append(
+                    "\t".join([str(state - START), str(to - START), self.classes.describe(column), exitable])
+                )
+
+        return "\n".join(result)
@@ -0,0 +1,521 @@
+"""
+    Замеры скорости OurSQL: python -m OurSQL.bench [раздел ...] [--statements N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .commands import ColumnDef, CreateDatabase, CreateTable, KeyDef
+from .parser import ForeignKey, OurSQLInterpreter, compile_script, compile_cached
+
+
+DATATYPES = ("INT", "FLOAT", "BOOLEAN", "STR")
+
+## {тип: примеры DEFAULT} - интерпретатор требует, чтобы тип значения совпадал с типом колонки
+DEFAULTS = {
+    "INT"  : ("0", "42", "-7"),
+    "FLOAT": ("1.5", "-0.25"),
+    "STR"  : ('"basic"', "'n/a'"),
+}
+
+
+def column(rnd: random.Random, name: str) -> str:
+    dtype = rnd.choice(DATATYPES)
+    parts = [name, dtype]
+
+    if dtype in DEFAULTS and rnd.random() < 0.4:
+        parts.append(f"DEFAULT {rnd.choice(DEFAULTS[dtype])}")
+    if rnd.random() < 0.3:
+        parts.append("NOT NULL")
+
+    return " ".join(parts)
+
+
+def create_table(rnd: random.Random, name: str, tables: list[str]) -> str:
+    names = [f"c{i}" for i in range(rnd.randint(3, 8))]
+    lines = ["id INT PRIMARY KEY AUTOINCREMENT"] + [column(rnd, col) for col in names]
+
+    if tables and rnd.random() < 0.5:
+        target = rnd.choice(tables)
+        #  Без ON DELETE ключ запрещал бы DROP TABLE ниже, и скрипт падал бы
+        on = rnd.choice([" ON DELETE SET NULL", " ON DELETE CASCADE", " ON UPDATE RESTRICT ON DELETE CASCADE"])
+        lines.append(f"FOREIGN KEY ({rnd.choice(names)}) REFERENCES {target}(id){on}")
+
+    body = ",\n    ".join(lines)
+    return f"CREATE TABLE {name}(\n    {body}\n);"
+
+
+def generate_script(statements: int, seed: int = 0) -> str:
+    """
+        DDL-миграция из statements инструкций: базы, таблицы с ключами и
+        DEFAULT, ALTER и DROP. Выполняется на чистом интерпретаторе без ошибок.
+    """
+    rnd = random.Random(seed)
+    lines = []
+    tables: list[str] = []
+
+    while len(lines) < statements:
+        roll = rnd.random()
+
+        if not tables or roll < 0.4:
+            name = f"t{len(lines)}"
+            lines.append(create_table(rnd, name, tables))
+            tables.append(name)
+
+        elif roll < 0.6:
+            lines.append(f"ALTER TABLE {rnd.choice(tables)} ADD {column(rnd, f'a{len(lines)}')};")
+
+        elif roll < 0.7:
+            lines.append(f"ALTER TABLE {rnd.choice(tables)} ALTER COLUMN c0 {rnd.choice(DATATYPES)};")
+
+        elif roll < 0.8:
+            lines.append(f"DROP TABLE IF EXISTS {tables.pop(rnd.randrange(len(tables)))};")
+
+        elif roll < 0.9:
+            name = f"db{len(lines)}"
+            lines.append(f"CREATE DATABASE IF NOT EXISTS {name};")
+
+        else:
+            lines.append("USE __MAIN__;")
+
+    return "\n".join(lines) + "\n"
+
+
+def timeit(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parse(statements: int, repeat: int) -> None:
+    script = generate_script(statements)
+    print(f"Parsing a generated DDL script: {statements} statements, {len(script)} chars")
+    print("mode\tcompile s\tcompile stmt/s\trun s\trun stmt/s")
+
+    commands = dict()
+    for mode in ("lalr", "earley"):
+        #  Сборка самого парсера в замер не входит
+        compile_script("USE __MAIN__;", mode, fallback=None)
+
+        compile_ = timeit(lambda: compile_script(script, mode, fallback=None), repeat)
+        run = timeit(lambda: OurSQLInterpreter(mode, fallback=False).run(script), repeat)
+        commands[mode] = compile_script(script, mode, fallback=None)
+
+        print(mode, f"{compile_:.4f}", f"{statements / compile_:,.0f}", f"{run:.4f}", f"{statements / run:,.0f}", sep="\t")
+
+    if commands["lalr"] != commands["earley"]:
+        raise AssertionError("LALR и Earley дали разные команды")
+
+
+def bench_prepared(statements: int, repeat: int) -> None:
+    #  То, что инструменты шлют раз за разом
+    batch = [
+        "USE __MAIN__;",
+        "CREATE DATABASE IF NOT EXISTS tools;",
+        "CREATE TABLE IF NOT EXISTS jobs(id INT PRIMARY KEY AUTOINCREMENT, name STR NOT NULL, state STR DEFAULT 'new');",
+        "DROP TABLE IF EXISTS tmp;",
+    ]
+    sent = [batch[i % len(batch)] for i in range(statements * 10)]
+    print(f"Repeated statements: {len(sent)} runs of {len(batch)} distinct statements")
+    print("cache\tseconds\tstmt/s\thits\tmisses")
+
+    for cache in (False, True):
+        compile_cached.cache_clear()
+        interpreter = OurSQLInterpreter(cache=cache)
+
+        def run():
+            for statement in sent:
+                interpreter.run(statement)
+
+        seconds = timeit(run, repeat)
+        info = compile_cached.cache_info()
+        print("on" if cache else "off", f"{seconds:.4f}", f"{len(sent) / seconds:,.0f}", info.hits, info.misses, sep="\t")
+
+
+def bench_stream(statements: int, repeat: int) -> None:
+    statements *= 10
+    script = generate_script(statements, seed=1)
+    print(f"Whole-script run() vs run_stream() from a file: {statements} statements, {len(script) / 2**20:.1f} MiB")
+    print("executor\tseconds\tstmt/s\tpeak MiB\tslowest statement s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dump.sql")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(script)
+        del script
+
+        def whole():
+            with open(path, encoding="utf-8") as file:
+                OurSQLInterpreter().run(file.read())
+            return 0.0
+
+        def streamed():
+            return max(
+                report.parse_seconds + report.run_seconds
+                for report in OurSQLInterpreter().run_stream(path)
+            )
+
+        for name, func in (("run()", whole), ("run_stream()", streamed)):
+            seconds = timeit(func, repeat)
+
+            tracemalloc.start()
+            slowest = func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(
+                name,
+                f"{seconds:.4f}",
+                f"{statements / seconds:,.0f}",
+                f"{peak / 2**20:.1f}",
+                f"{slowest:.5f}" if slowest else "-",
+                sep="\t"
+            )
+
+
+def bench_catalog(statements: int, repeat: int) -> None:
+    print("Cold start from a persistent catalog vs replaying the whole DDL history")
+    print("history\tsnapshot KiB\twal KiB\topen s\treplay s")
+
+    for history in (statements, statements * 10, statements * 40):
+        script = generate_script(history, seed=2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            interpreter = OurSQLInterpreter(catalog=directory)
+            for _ in interpreter.run_stream([script]):
+                pass
+            #  Без checkpoint(), как после падения: хвост журнала остается
+            catalog = interpreter.catalog
+            catalog.close()
+
+            #  На короткой истории снимка еще может не быть
+            sizes = [
+                os.path.getsize(path) / 1024 if os.path.exists(path) else 0
+                for path in (catalog.snapshot_path, catalog.wal_path)
+            ]
+
+            def open_catalog():
+                OurSQLInterpreter(catalog=directory).catalog.close()
+
+            opened = timeit(open_catalog, repeat)
+            replayed = timeit(lambda: OurSQLInterpreter(cache=False).run(script), repeat)
+
+        print(history, f"{sizes[0]:.0f}", f"{sizes[1]:.0f}", f"{opened:.4f}", f"{replayed:.4f}", sep="\t")
+
+
+def scan_dependents(interpreter: OurSQLInterpreter, table: str) -> list[tuple[str, str]]:
+    #  Как искали бы зависимых без индекса: по всем колонкам всех таблиц базы
+    return [
+        (user, field.name)
+        for user, fields in interpreter.databases[interpreter.cursor].items()
+        for field in fields.values()
+        if isinstance(field.key, ForeignKey) and field.key.table == table
+    ]
+
+
+def reference_tree(tables: int, fanout: int = 8) -> list[CreateTable]:
+    """
+        t0 <- t1..t8 <- ...: каждая таблица ссылается на t{(i - 1) // fanout},
+        ON DELETE через одну cascade и set null.
+    """
+    actions = ("cascade", "set null")
+    commands = [CreateTable("t0", None, (ColumnDef("id", "int", key=KeyDef("primary")),))]
+
+    for i in range(1, tables):
+        key = KeyDef("foreign", f"t{(i - 1) // fanout}", "id", (("delete", actions[i % 2]),))
+        columns = (ColumnDef("id", "int", key=KeyDef("primary")), ColumnDef("parent", "int", key=key))
+        commands.append(CreateTable(f"t{i}", None, columns))
+
+    return commands
+
+
+def bench_references(statements: int, repeat: int) -> None:
+    print("Finding and dropping dependents of a table: reverse index vs scanning every column")
+    print("tables	index lookup s	scan s	DROP leaf s	DROP CASCADE s	dropped")
+
+    for tables in (statements * 20, statements * 100):
+        interpreter = OurSQLInterpreter()
+        commands = reference_tree(tables)
+        for command in commands:
+            interpreter.execute(command)
+
+        #  Таблица из середины дерева: зависимые есть, но их немного
+        middle = f"t{tables // 100}"
+        if sorted(interpreter.dependents(middle)) != sorted(scan_dependents(interpreter, middle)):
+            raise AssertionError("Индекс и перебор нашли разных зависимых")
+
+        lookup = timeit(lambda: interpreter.dependents(middle), repeat)
+        scan = timeit(lambda: scan_dependents(interpreter, middle), repeat)
+
+        #  Лист: удаляем и создаем заново, чтобы каждый повтор был одинаковым
+        leaf = commands[-1]
+
+        def drop_leaf():
+            interpreter.drop_table(leaf.name)
+            interpreter.execute(leaf)
+
+        leaf_seconds = timeit(drop_leaf, repeat)
+
+        #  Уходит поддерево t1 по ключам с cascade, ключи с set null отцепляются
+        before = len(interpreter.databases["__MAIN__"])
+        start = time.perf_counter()
+        interpreter.drop_table("t1")
+        cascade = time.perf_counter() - start
+        dropped = before - len(interpreter.databases["__MAIN__"])
+
+        print(tables, f"{lookup:.6f}", f"{scan:.4f}", f"{leaf_seconds:.6f}", f"{cascade:.4f}", dropped, sep="\t")
+
+
+class LegacyPrimaryKey:
+    pass
+
+
+class LegacyForeignKey:
+
+    def __init__(self, table, column, update="restrict", delete="restrict"):
+        self.table = table
+        self.column = column
+        self.update = update
+        self.delete = delete
+
+
+class LegacyField:
+
+    def __init__(self, name, dtype="str", default=None, null=True, key=None):
+        self.name = name
+        self.dtype = dtype
+        self.default = default
+        self.null = null
+        self.key = key
+
+
+def fresh(string: str) -> str:
+    #  Новая строка с тем же текстом, как str(Token) при каждом разборе
+    return "".join(list(string))
+
+
+def legacy_table(columns: tuple[ColumnDef, ...]) -> dict:
+    """
+        Таблица в прежнем виде: Field с __dict__, свой объект ключа на
+        каждую колонку, неинтернированные имена.
+    """
+    fields = dict()
+    for column in columns:
+        key = None
+        if column.key is not None and column.key.kind == "primary":
+            key = LegacyPrimaryKey()
+        elif column.key is not None:
+            key = LegacyForeignKey(fresh(column.key.table), fresh(column.key.column), **dict(column.key.options))
+
+        name = fresh(column.name)
+        fields[name] = LegacyField(name, fresh(column.dtype), column.default, column.null, key)
+    return fields
+
+
+def wide_schema(databases: int, tables: int, columns: int) -> dict[str, list[CreateTable]]:
+    """
+        {база: [CREATE TABLE]}: в каждой таблице id, ссылка на предыдущую
+        таблицу и columns обычных колонок c0, c1, ...
+    """
+    rnd = random.Random(3)
+    schema = dict()
+
+    for d in range(databases):
+        commands = []
+        for t in range(tables):
+            table = [ColumnDef("id", "int", key=KeyDef("primary"))]
+            if t:
+                key = KeyDef("foreign", f"t{t - 1}", "id", (("delete", "cascade"),))
+                table.append(ColumnDef("parent", "int", key=key))
+            for c in range(columns):
+                table.append(ColumnDef(f"c{c}", rnd.choice(DATATYPES).lower(), null=rnd.choice((True, "not_null"))))
+            commands.append(CreateTable(f"t{t}", None, tuple(table)))
+        schema[f"db{d}"] = commands
+
+    return schema
+
+
+def bench_memory(statements: int, repeat: int) -> None:
+    databases, tables, columns = 4, statements * 2, 50
+    schema = wide_schema(databases, tables, columns)
+    total = databases * tables * (columns + 2)
+    print(f"Catalog memory: {databases} databases x {tables} tables x {columns + 2} columns = {total:,} columns")
+    print("layout	MiB	bytes/column	seconds")
+
+    def legacy():
+        return {
+            fresh(database): {fresh(command.name): legacy_table(command.columns) for command in commands}
+            for database, commands in schema.items()
+        }
+
+    def compact():
+        interpreter = OurSQLInterpreter()
+        for database, commands in schema.items():
+            interpreter.execute(CreateDatabase(fresh(database), None))
+            interpreter.use(database)
+            for command in commands:
+                interpreter.execute(command._replace(name=fresh(command.name)))
+        return interpreter
+
+    for name, build in (("legacy", legacy), ("compact", compact)):
+        seconds = timeit(build, repeat)
+
+        tracemalloc.start()
+        catalog = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del catalog
+
+        print(name, f"{size / 2**20:.1f}", f"{size / total:.0f}", f"{seconds:.4f}", sep="\t")
+
+
+def run_python(code: str, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def bench_startup(statements: int, repeat: int) -> None:
+    print("Process startup: import OurSQL.parser and run the first statement")
+    print("case\tseconds")
+
+    first = "from OurSQL.parser import OurSQLInterpreter; OurSQLInterpreter().run('CREATE DATABASE d;')"
+    directory = tempfile.mkdtemp(prefix="oursql-bench-")
+    env = dict(os.environ, OURSQL_CACHE_DIR=directory)
+
+    def cold():
+        shutil.rmtree(directory, ignore_errors=True)
+        return run_python(first, env)
+
+    try:
+        cases = [
+            ("python only", lambda: run_python("pass", env)),
+            ("import", lambda: run_python("import OurSQL.parser", env)),
+            ("first statement, cold cache", cold),
+            ("first statement, warm cache", lambda: run_python(first, env)),
+        ]
+        for name, func in cases:
+            print(name, f"{min(func() for _ in range(repeat)):.4f}", sep="\t")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def client_statements(client: int, count: int) -> list[str]:
+    #  Поровну чтения (USE, SHOW) и DDL; имена повторяются, как у живых клиентов
+    statements = []
+    for i in range(count):
+        match i % 4:
+            case 0:
+                statements.append("USE __MAIN__;")
+            case 1:
+                statements.append(f"CREATE TABLE IF NOT EXISTS s{client}_{i % 20}(id INT PRIMARY KEY, name STR NOT NULL DEFAULT 'x');")
+            case 2:
+                statements.append("SHOW DATABASES;")
+            case 3:
+                statements.append(f"DROP TABLE IF EXISTS s{client}_{(i + 10) % 20};")
+    return statements
+
+
+async def load_client(path: str, statements: list[str], latencies: list[float]) -> None:
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        for text in statements:
+            start = time.perf_counter()
+            writer.write(text.encode("utf-8") + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+
+            if not reply["ok"]:
+                raise AssertionError(f"{text}: {reply['error']}")
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def load(path: str, clients: int, total: int) -> tuple[float, list[float]]:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        load_client(path, client_statements(client, total // clients), latencies)
+        for client in range(clients)
+    ))
+    return time.perf_counter() - start, latencies
+
+
+def bench_server(statements: int, repeat: int) -> None:
+    total = statements * 4
+    print(f"Server over a unix socket: {total} statements split between clients, server in its own process")
+    print("clients	stmt/s	p50 ms	p95 ms	p99 ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "oursql.sock")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "OurSQL.server", "--unix", path],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            #  Первая строка сервера - он слушает сокет
+            server.stdout.readline()
+
+            for clients in (1, 4, 16, 64):
+                seconds, latencies = min(
+                    (asyncio.run(load(path, clients, total)) for _ in range(repeat)),
+                    key=lambda result: result[0],
+                )
+                cuts = statistics.quantiles(latencies, n=100)
+                print(
+                    clients,
+                    f"{len(latencies) / seconds:,.0f}",
+                    *(f"{cuts[p - 1] * 1000:.2f}" for p in (50, 95, 99)),
+                    sep="\t"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+## {раздел: функция(statements, repeat)}
+SECTIONS = {
+    "parse"     : bench_parse,
+    "startup"   : bench_startup,
+    "prepared"  : bench_prepared,
+    "catalog"   : bench_catalog,
+    "references": bench_references,
+    "memory"    : bench_memory,
+    "server"    : bench_server,
+    "stream"    : bench_stream,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m OurSQL.bench", description="Замеры скорости OurSQL")
+    parser.add_argument("sections", nargs="*", metavar="section", help=f"что замерять: {', '.join(SECTIONS)} (по умолчанию все)")
+    parser.add_argument("--statements", type=int, default=500, help="инструкций в сгенерированном скрипте")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    for section in args.sections:
+        if section not in SECTIONS:
+            parser.error(f"неизвестный раздел {section!r}, есть: {', '.join(SECTIONS)}")
+
+    for section in args.sections or SECTIONS:
+        SECTIONS[section](args.statements, args.repeat)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+from .commands import Command
+
+
+#  Заголовок записи журнала: длина и crc32 тела
+RECORD = struct.Struct("<II")
+
+WAL_NAME = "catalog.wal"
+SNAPSHOT_NAME = "catalog.snapshot"
+
+
+class Catalog:
+    """
+        Каталог баз на диске: журнал примененных DDL-команд (WAL) плюс
+        периодический снимок всего каталога.
+
+        Каждая команда, изменившая каталог, дописывается в журнал записью
+        (lsn, база, команда). Раз в snapshot_every записей каталог целиком
+        сохраняется в снимок (через временный файл и os.replace), а журнал
+        начинается заново. При открытии читается снимок (через mmap) и
+        доигрывается только хвост журнала после него, так что время старта
+        зависит от размера схемы, а не от длины ее истории.
+
+        Недописанная запись в конце журнала (процесс упал посреди записи)
+        отбрасывается. Файлы - pickle, читать их можно только свои.
+    """
+
+    def __init__(self, directory:str, snapshot_every:int=1000, sync:bool=False):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+
+        self.wal_path = os.path.join(directory, WAL_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+
+        #  Номер последней записанной команды и сколько их с последнего снимка
+        self.lsn = 0
+        self.pending = 0
+        self.wal = None
+
+    def load(self) -> tuple[dict | None, list[tuple[int, str, Command]]]:
+        """
+            (каталог из снимка или None, [(lsn, база, команда)] из хвоста журнала).
+            После load() журнал открыт на дозапись.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        databases = None
+        if os.path.exists(self.snapshot_path) and os.path.getsize(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    self.lsn, databases = pickle.loads(data)
+
+        tail = []
+        good = 0
+
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, "rb") as file:
+                data = file.read()
+
+            pos = 0
+            while pos + RECORD.size <= len(data):
+                length, crc = RECORD.unpack_from(data, pos)
+                body = data[pos + RECORD.size:pos + RECORD.size + length]
+                if len(body) < length or zlib.crc32(body) != crc:
+                    break
+
+                lsn, database, command = pickle.loads(body)
+                pos += RECORD.size + length
+                good = pos
+
+                #  Записи до снимка уже в нем (упали между снимком и сбросом журнала)
+                if lsn > self.lsn:
+                    tail.append((lsn, database, command))
+
+        if tail:
+            self.lsn = tail[-1][0]
+        self.pending = len(tail)
+
+        self.wal = open(self.wal_path, "ab")
+        self.wal.truncate(good)
+
+        return databases, tail
+
+    def append(self, database:str, command:Command) -> None:
+        self.lsn += 1
+        body = pickle.dumps((self.lsn, database, command), pickle.HIGHEST_PROTOCOL)
+
+        self.wal.write(RECORD.pack(len(body), zlib.crc32(body)) + body)
+        self.wal.flush()
+        if self.sync:
+            os.fsync(self.wal.fileno())
+
+        self.pending += 1
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self.pending >= self.snapshot_every
+
+    def snapshot(self, databases:dict) -> None:
+        """
+            Сохранить каталог целиком и начать журнал заново.
+        """
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump((self.lsn, databases), file, pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        self.wal.truncate(0)
+        self.pending = 0
+
+    def close(self) -> None:
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
@@ -0,0 +1,218 @@
+from typing import NamedTuple, Union
+
+from lark import Transformer
+
+
+class KeyDef(NamedTuple):
+    """
+        PRIMARY KEY или FOREIGN KEY ... REFERENCES table(column) ON ... .
+    """
+    kind   : str                            #  "primary" | "foreign"
+    table  : str | None = None
+    column : str | None = None
+    options: tuple[tuple[str, str], ...] = ()  #  (("delete", "cascade"), ...)
+
+    @property
+    def name(self) -> str:
+        return "PrimaryKey" if self.kind == "primary" else "ForeignKey"
+
+
+class ColumnDef(NamedTuple):
+    name   : str
+    dtype  : str
+    default: str | None = None
+    null   : bool | str = True
+    key    : KeyDef | None = None
+
+
+class CreateDatabase(NamedTuple):
+    name  : str
+    exists: bool | None
+
+
+class CreateTable(NamedTuple):
+    name   : str
+    exists : bool | None
+    columns: tuple[ColumnDef, ...]
+
+
+class Use(NamedTuple):
+    name: str
+
+
+class Show(NamedTuple):
+    what: str                               #  "databases" | "tables"
+
+
+class Drop(NamedTuple):
+    entity: str | None                      #  "database" | "table" | None
+    exists: bool | None
+    name  : str
+
+
+class AlterTable(NamedTuple):
+    name  : str
+    exists: bool | None
+    action: str                             #  "add" | "drop" | "alter"
+    args  : tuple
+
+
+Command = Union[CreateDatabase, CreateTable, Use, Show, Drop, AlterTable]
+
+
+class Value(NamedTuple):
+    """
+        Литерал DEFAULT: тип (str, int, float, null) и текст как в запросе.
+    """
+    kind: str
+    text: str
+
+
+class Compiler(Transformer):
+    """
+        Дерево разбора -> кортеж команд за один проход снизу вверх.
+
+        Все проверки, которые не зависят от состояния баз (повторы колонок
+        и атрибутов, тип DEFAULT, ключ на несуществующую колонку), делаются
+        здесь, так что готовую команду можно выполнять сколько угодно раз.
+        С LALR передается прямо в Lark(transformer=...), и дерево вообще не
+        строится.
+
+        exists: None - условия нет, True - IF EXISTS, False - IF NOT EXISTS.
+    """
+
+    def start(self, items):
+        return tuple(items)
+
+    def ddl_use(self, items):
+        return Use(str(items[0]))
+
+    def ddl_show(self, items):
+        return Show(items[0].lower())
+
+    def ddl_exists(self, items):
+        return items[0] is None
+
+    def ddl_create(self, items):
+        entity, exists, name, *struct = items
+
+        if entity.lower() == "database":
+            return CreateDatabase(str(name), exists)
+        return CreateTable(str(name), exists, struct[0])
+
+    def ddl_drop(self, items):
+        entity, exists, name = items
+        return Drop(entity.lower() if entity is not None else None, exists, str(name))
+
+    def ddl_alter(self, items):
+        #  ddl_exists? без [] - при отсутствии его просто нет среди items
+        exists = items.pop(0) if isinstance(items[0], bool) else None
+        name, (action, args) = items
+        return AlterTable(str(name), exists, action, args)
+
+    def ddl_alter_add(self, items):
+        return "add", tuple(items)
+
+    def ddl_alter_drop(self, items):
+        return "drop", (str(items[0]),)
+
+    def ddl_alter_alter(self, items):
+        return "alter", tuple(items)
+
+    def ddl_table_struct(self, items):
+        ## {имя: ColumnDef}
+        columns = dict()
+
+        for item in items:
+            if isinstance(item, ColumnDef):
+                if item.name in columns:
+                    raise ValueError(f"Column {item.name} is already defined.")
+                columns[item.name] = item
+                continue
+
+            target, key = item
+            if target not in columns:
+                raise ValueError(f"Column {target} is not defined.")
+            if columns[target].key is not None:
+                raise ValueError(f"{target} is already a {columns[target].key.name}.")
+
+            columns[target] = columns[target]._replace(key=key)
+
+        return tuple(columns.values())
+
+    def ddl_var_def(self, items):
+        name, dtype, *attrs = items
+
+        column = ColumnDef(str(name), dtype.lower())
+        visited_attrs = set()
+
+        for attr_name, value in attrs:
+            if attr_name in visited_attrs:
+                raise ValueError(f"Дублирование атрибутов")
+            visited_attrs.add(attr_name)
+
+            if attr_name == "default":
+                if value.kind != column.dtype:
+                    raise ValueError(f"Value {value.text} doesnt match type {column.dtype}")
+                column = column._replace(default=value.text)
+
+            elif attr_name == "not_null":
+                column = column._replace(null="not_null")
+
+            else:
+                column = column._replace(key=value)
+
+        return column
+
+    #  Атрибуты колонки: (имя атрибута, значение)
+
+    def default(self, items):
+        value = items[0]
+        if not isinstance(value, Value):
+            #  CURRENT_TIMESTAMP
+            value = Value(value.lower(), str(value))
+        return "default", value
+
+    def not_null(self, items):
+        return "not_null", None
+
+    def primary_key(self, items):
+        return "primary_key", KeyDef("primary")
+
+    def foreign_key(self, items):
+        table, column, *options = items
+        return "foreign_key", KeyDef("foreign", str(table), str(column), self.check_options(options))
+
+    def set_primary(self, items):
+        return str(items[0]), KeyDef("primary")
+
+    def set_foreign(self, items):
+        target, table, column, *options = items
+        return str(target), KeyDef("foreign", str(table), str(column), self.check_options(options))
+
+    def on_option(self, items):
+        option, *action = items
+        return option.lower(), " ".join(action).lower()
+
+    @staticmethod
+    def check_options(options):
+        seen = set()
+        for option, _ in options:
+            if option in seen:
+                raise ValueError(f"Duplicate options {option}")
+            seen.add(option)
+        return tuple(options)
+
+    #  Литералы DEFAULT
+
+    def str(self, items):
+        return Value("str", str(items[0]))
+
+    def int(self, items):
+        return Value("int", "".join(items))
+
+    def float(self, items):
+        return Value("float", "".join(items))
+
+    def null(self, items):
+        return Value("null", str(items[0]))
@@ -18,7 +18,7 @@ default: "DEFAULT"i (dataval | /CURRENT_TIMESTAMP/i)
 not_null: "NOT"i "NULL"i
 
 ?key: primary_key | foreign_key
-foreign_key: "FOREIGN"i "KEY"i "REFERENCES"i VAR "(" VAR ")" [on_option]*
+foreign_key: "FOREIGN"i "KEY"i "REFERENCES"i VAR "(" VAR ")" on_option*
 on_option: "ON"i (/DELETE/i | /UPDATE/i) (/RESTRICT/i
                             | /CASCADE/i
                             | /SET/i /NULL/i
@@ -27,7 +27,7 @@ on_option: "ON"i (/DELETE/i | /UPDATE/i) (/RESTRICT/i
 primary_key: "PRIMARY"i "KEY"i [/AUTOINCREMENT/i]
 
 ?set_key: set_foreign | set_primary
-set_foreign: "FOREIGN"i "KEY"i "(" VAR ")" "REFERENCES"i VAR "(" VAR ")" [on_option]*
+set_foreign: "FOREIGN"i "KEY"i "(" VAR ")" "REFERENCES"i VAR "(" VAR ")" on_option*
 set_primary: "PRIMARY"i "KEY"i "(" VAR ")"
 
 ddl_alter: "ALTER"i "TABLE"i ddl_exists? VAR (ddl_alter_add | ddl_alter_drop | ddl_alter_alter)
@@ -44,7 +44,7 @@ str: /"[^"]*"/ | /'[^']*'/
 
 NUMBER: /[0-9]/+
 int: /-/? NUMBER
-float: /-/? NUMBER /./ NUMBER
+float: /-/? NUMBER /\\./ NUMBER
 null: /NULL/ | /(N|n)ull/
 bool: /(T|t)rue/|/(F|f)alse/
 
@@ -1,23 +1,159 @@
-from lark import Lark, Transformer
+import copy
+import hashlib
+import os
+import stat
+import sys
+import time
+from functools import lru_cache
+from typing import Iterator
+
+import lark
+from lark import Lark, Tree
+from lark.exceptions import UnexpectedInput, VisitError
+from .catalog import Catalog
+from .commands import Command, Compiler, CreateDatabase, CreateTable, Use, Show, Drop, AlterTable, KeyDef
 from .grammar import DDL_GRAMMAR
-
-
-class Beautifier(Transformer):
-
-    def ddl_exists(self, items):
-        return items[0] is None
+from .stream import StatementReport, read_chunks, split_statements
+
+
+## {режим: параметры Lark}
+PARSER_OPTIONS = {
+    #  LALR(1) с контекстным лексером в разы быстрее Earley на токен;
+    #  Earley остается запасным вариантом (см. compile_script)
+    "lalr"  : {"parser": "lalr", "lexer": "contextual"},
+    "earley": {"parser": "earley"},
+}
+
+
+def cache_dir() -> str:
+    """
+        Свой у каждого пользователя (~/.cache/oursql), а не общий в /tmp:
+        кеш Lark - это pickle, и чужой файл в нем означал бы чужой код.
+    """
+    if os.environ.get("OURSQL_CACHE_DIR"):
+        return os.environ["OURSQL_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "oursql")
+
+
+def private_dir(directory:str) -> bool:
+    """
+        Создать directory (0o700), если ее нет. True, если она наша и
+        писать в нее больше никто не может - только тогда кешу можно верить.
+    """
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.stat(directory)
+    except OSError:
+        return False
+
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def cache_path(mode:str) -> str:
+    """
+        Файл с таблицами LALR. Ключ - хеш грамматики, параметров, версий lark
+        и Python: поменялось что-то из этого - файл другой, старый не читается.
+    """
+    key = repr((DDL_GRAMMAR, PARSER_OPTIONS[mode], lark.__version__, sys.version_info[:2]))
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"ddl-{mode}-{digest}.lark")
+
+
+#  Длиннее инструкции в кеш скомпилированных не кладем (целые дампы и т.п.)
+MAX_CACHED_TEXT = 4096
+
+
+@lru_cache(maxsize=None)
+def get_parser(mode:str="lalr") -> Lark:
+    """
+        Парсер строится при первом обращении, а не при импорте модуля.
+        Таблицы LALR сохраняются на диск (cache_path) и при следующем
+        запуске читаются оттуда; Earley Lark кешировать не умеет.
+
+        LALR сразу отдает команды: Compiler вызывается по ходу разбора, без
+        дерева. Earley отдает дерево, его превращает в команды compile_script.
+    """
+    options = PARSER_OPTIONS[mode]
+
+    if options["parser"] != "lalr":
+        return Lark(DDL_GRAMMAR, start='start', **options)
+
+    options = dict(options, transformer=Compiler())
+
+    path = cache_path(mode)
+    if not private_dir(os.path.dirname(path)):
+        #  Писать некуда или каталог чужой - просто собираем каждый раз
+        return Lark(DDL_GRAMMAR, start='start', **options)
+
+    #  Битый или недописанный файл Lark не примет и пересоберет таблицы
+    return Lark(DDL_GRAMMAR, start='start', cache=path, **options)
+
+
+def parse_commands(parser:Lark, text:str) -> tuple[Command, ...]:
+    try:
+        result = parser.parse(text)
+        if isinstance(result, Tree):
+            result = Compiler().transform(result)
+    except VisitError as error:
+        #  Ошибка в проверках Compiler - отдаем ее как есть, без обертки Lark
+        raise error.orig_exc from None
+    return result
+
+
+def compile_script(text:str, mode:str="lalr", fallback:str|None="earley") -> tuple[Command, ...]:
+    """
+        Текст -> кортеж команд. Если LALR не разобрал текст, пробуем fallback:
+        имя, совпавшее с ключевым словом (колонка primary и т.п.), LALR
+        считает ключевым словом, а Earley разбирает такие места по контексту.
+    """
+    try:
+        return parse_commands(get_parser(mode), text)
+    except UnexpectedInput as error:
+        if fallback is None or fallback == mode:
+            raise
+        try:
+            return parse_commands(get_parser(fallback), text)
+        except UnexpectedInput:
+            raise error from None
+
+
+@lru_cache(maxsize=1024)
+def compile_cached(text:str, mode:str="lalr", fallback:str|None="earley") -> tuple[Command, ...]:
+    """
+        compile_script с LRU-кешем по тексту инструкции: повторные USE, SHOW,
+        CREATE ... IF NOT EXISTS не разбираются заново. Команды неизменяемы,
+        так что одну и ту же можно выполнять сколько угодно раз.
+        Статистика - compile_cached.cache_info().
+    """
+    return compile_script(text, mode, fallback)
 
 
 class PrimaryKey:
+    """
+        Один на весь процесс: PRIMARY_KEY. Из снимка каталога тоже
+        читается он же, а не новая копия на каждую колонку.
+    """
+    __slots__ = ()
 
-    def __init__(self):
-        pass
+    def __reduce__(self):
+        return "PRIMARY_KEY"
 
     def __repr__(self):
         return f"{self.__class__.__name__}"
 
 
+PRIMARY_KEY = PrimaryKey()
+
+
 class ForeignKey:
+    """
+        Общий для всех колонок с одинаковой ссылкой (см. foreign_key),
+        поэтому не меняется после создания.
+    """
+    __slots__ = ("table", "column", "update", "delete")
 
     def __init__(self, table, column, update="restrict", delete="restrict"):
         self.table = table
@@ -29,7 +165,14 @@ class ForeignKey:
         return f"{self.__class__.__name__} references {self.table}({self.column}), on update: {self.update}, on delete: {self.delete}"
 
 
+@lru_cache(maxsize=1 << 16)
+def foreign_key(table:str, column:str, update:str="restrict", delete:str="restrict") -> ForeignKey:
+    return ForeignKey(sys.intern(table), sys.intern(column), sys.intern(update), sys.intern(delete))
+
+
 class Field:
+    #  Колонок в каталоге миллионы: без __dict__ на каждую
+    __slots__ = ("name", "dtype", "default", "null", "key")
 
     def __init__(self, name, dtype="str", default=None, null=True, key=None):
         self.name = name
@@ -44,98 +187,292 @@ class Field:
 
 class OurSQLInterpreter:
 
-    parser = Lark(DDL_GRAMMAR, start='start', parser="earley")
+    def __init__(self, mode:str="lalr", fallback:bool=True, cache:bool=True, catalog:str|Catalog|None=None):
+        """
+            catalog - каталог на диске (путь или Catalog): с ним базы
+            переживают перезапуск, см. Catalog.
+        """
+        if mode not in PARSER_OPTIONS:
+            raise ValueError(f"Unknown parser mode \"{mode}\", expected one of {list(PARSER_OPTIONS)}")
 
-    pipe = (
-        # DuplicateAttributeChecker(),
-        Beautifier(),
-    )
+        self.mode = mode
+        self.fallback_mode = "earley" if fallback and mode != "earley" else None
+        self.cache = cache
 
-    def __init__(self):
         self.databases = {"__MAIN__": dict()}
         self.cursor = "__MAIN__"
 
+        #  Куда печатает SHOW: None - sys.stdout
+        self.output = None
+
+        #  Обратный индекс внешних ключей: кто ссылается на колонку.
+        #  Ключ ссылается только на таблицу своей же базы.
+        ## {база: {таблица: {колонка: {(ссылающаяся таблица, ее колонка)}}}}
+        self.references = {"__MAIN__": dict()}
+
+        self.catalog = None
+        if catalog is not None:
+            self.open_catalog(Catalog(catalog) if isinstance(catalog, (str, os.PathLike)) else catalog)
+
+    def open_catalog(self, catalog:Catalog):
+        databases, tail = catalog.load()
+        if databases is not None:
+            self.databases = databases
+            #  Индекс в снимок не пишется - он целиком выводится из схемы
+            self.index_references()
+
+        #  Хвост журнала доигрывается теми же командами, без повторной записи
+        for _, database, command in tail:
+            self.cursor = database
+            self.execute(command)
+        self.cursor = "__MAIN__"
+
+        self.catalog = catalog
+
+    def checkpoint(self):
+        """
+            Снимок каталога прямо сейчас (следующий старт не читает журнал).
+        """
+        if self.catalog is not None:
+            self.catalog.snapshot(self.databases)
+
+    def close(self):
+        if self.catalog is not None:
+            self.checkpoint()
+            self.catalog.close()
+            self.catalog = None
+
+    def session(self) -> "OurSQLInterpreter":
+        """
+            Еще один курсор над теми же базами и каталогом: свой USE и свой
+            output, а изменения схемы видны всем. Сессия не синхронизирована -
+            одновременный доступ из разных потоков разводит вызывающий
+            (см. server.OurSQLServer). Закрывать сессию не нужно, закрывается
+            интерпретатор, от которого она создана.
+        """
+        session = copy.copy(self)
+        session.cursor = "__MAIN__"
+        session.output = None
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __repr__(self):
         return f"{self.__class__.__name__}(selected:{self.cursor}, databases:{self.databases})"
 
+    @property
+    def parser(self) -> Lark:
+        return get_parser(self.mode)
+
     def select(self, database:str):
         if database not in self.databases:
             raise ValueError(f"Database \"{database}\" does not exist.")
         self.cursor = database
 
-    def _parse_string(self, string:str):
-        tree = self.parser.parse(string)
-        for transformer in self.pipe:
-            tree = transformer.transform(tree)
-        return tree
+    def compile(self, text:str) -> tuple[Command, ...]:
+        #  Ключ кеша - текст без пробелов по краям; внутри текста пробелы
+        #  не трогаем, они бывают частью строковых литералов
+        text = text.strip()
+        if not self.cache or len(text) > MAX_CACHED_TEXT:
+            return compile_script(text, self.mode, self.fallback_mode)
+        return compile_cached(text, self.mode, self.fallback_mode)
 
     def run(self, string:str):
-        tree = self._parse_string(string)
-
-        for instruction in tree.children:
-            if instruction.data.value == "ddl_create":
-                self.create(*instruction.children)
-
-            elif instruction.data.value == "ddl_use":
-                self.use(*instruction.children)
-
-            elif instruction.data.value == "ddl_show":
-                self.show(*instruction.children)
-
-            elif instruction.data.value == "ddl_drop":
-                self.drop(*instruction.children)
+        for command in self.compile(string):
+            self.execute(command)
+
+    def run_stream(self, source, chunk_size:int=1 << 16, encoding:str="utf-8") -> Iterator[StatementReport]:
+        """
+            Выполнять инструкции по одной, по мере чтения source (путь к файлу,
+            открытый файл или итерируемое из кусков текста), отдавая по
+            StatementReport на каждую:
+
+                for report in interpreter.run_stream("dump.sql"):
+                    print(report.number, report.consumed, report.parse_seconds)
+
+            В памяти только текущая инструкция и ее команды. Ошибка в
+            инструкции пробрасывается с пометкой, где она (номер и строка
+            входа); все, что было до нее, уже выполнено и остается в силе.
+        """
+        statements = split_statements(read_chunks(source, chunk_size, encoding))
+
+        for number, (line, consumed, text) in enumerate(statements, 1):
+            started = time.perf_counter()
+            try:
+                commands = self.compile(text)
+                parsed = time.perf_counter()
+
+                for command in commands:
+                    self.execute(command)
+
+            except Exception as error:
+                error.add_note(f"OurSQL: statement {number} starting at line {line}")
+                raise
+
+            yield StatementReport(number, line, consumed, parsed - started, time.perf_counter() - parsed)
+
+    def execute(self, command:Command):
+        match command:
+            case CreateDatabase() | CreateTable():
+                self.create(command)
+            case Use(name):
+                self.use(name)
+            case Show(what):
+                self.show(what)
+            case Drop(entity, exists, name):
+                self.drop(entity, exists, name)
+            case AlterTable():
+                #  ALTER пока только разбирается
+                return
+
+        #  Дошли сюда - команда выполнена без ошибок
+        if self.catalog is not None and isinstance(command, (CreateDatabase, CreateTable, Drop)):
+            self.catalog.append(self.cursor, command)
+            if self.catalog.snapshot_due:
+                self.checkpoint()
 
     def drop(self, entity, exists, name):
 
-        entity_str = entity.value.lower()
-        name_str = name.value
-
         if exists is not  None and not exists:
             raise ValueError("Not exists in this context is always an error")
         
-        if entity_str == "database":
-            if name_str not in self.databases:
+        if entity == "database":
+            if name not in self.databases:
                 if exists is None:
-                    raise ValueError(f"Database {name_str} does not exist")
+                    raise ValueError(f"Database {name} does not exist")
                 else:
                     return
         
-            del self.databases[name_str]
+            #  Ключи не выходят за пределы базы: все, кто на нее ссылается, уходят вместе с ней
+            del self.databases[name]
+            self.references.pop(name, None)
         
-        elif entity_str == "table":
-            if name_str not in self.databases[self.cursor]:
+        elif entity == "table":
+            if name not in self.databases[self.cursor]:
                 if exists is None:
-                    raise ValueError(f"Database {name_str} does not exist")
+                    raise ValueError(f"Database {name} does not exist")
                 else:
                     return
-            del self.databases[self.cursor][name_str]
+            self.drop_table(name)
+
+        else:
+            raise ValueError(f"DROP {name}: TABLE or DATABASE expected")
+
+    def drop_table(self, name):
+        """
+            DROP TABLE с учетом ON DELETE ссылающихся ключей:
+            restrict и no action (по умолчанию) запрещают удаление,
+            cascade удаляет и ссылающуюся таблицу (а за ней - ее зависимых),
+            set null и set default снимают ключ с колонки (set null еще и
+            разрешает в ней NULL).
+
+            Сначала собирается все, что удаляется, и проверяются запреты,
+            потом меняется схема: при ошибке ничего не удалено. Работа
+            пропорциональна числу зависимых, а не размеру базы.
+        """
+        tables = self.databases[self.cursor]
+
+        dropped = {name}
+        queue = [name]
+        while queue:
+            for user, column in self.dependents(queue.pop()):
+                if user not in dropped and tables[user][column].key.delete == "cascade":
+                    dropped.add(user)
+                    queue.append(user)
+
+        ## [(ссылающаяся колонка, действие)]
+        detached = []
+        for table in dropped:
+            for user, column in self.dependents(table):
+                if user in dropped:
+                    continue
+
+                field = tables[user][column]
+                action = field.key.delete
+                if action not in ("set null", "set default"):
+                    raise ValueError(
+                        f"Cannot drop table {table}: {user}.{column} references it (ON DELETE {action.upper()})"
+                    )
+                detached.append((field, action))
+
+        for field, action in detached:
+            field.key = None
+            if action == "set null":
+                field.null = True
+
+        references = self.references.setdefault(self.cursor, dict())
+        for table in dropped:
+            self.remove_references(self.cursor, table, tables.pop(table))
+            #  Все, кто ссылался на table, либо удалены, либо отцеплены выше
+            references.pop(table, None)
+
+    def dependents(self, table, database=None) -> list[tuple[str, str]]:
+        """
+            [(таблица, колонка)] с внешними ключами на любую колонку table.
+        """
+        columns = self.references.get(database or self.cursor, dict()).get(table, dict())
+        return [user for users in columns.values() for user in users]
+
+    def add_references(self, database, table, fields):
+        references = self.references.setdefault(database, dict())
+        for field in fields.values():
+            if isinstance(field.key, ForeignKey):
+                columns = references.setdefault(field.key.table, dict())
+                columns.setdefault(field.key.column, set()).add((table, field.name))
+
+    def remove_references(self, database, table, fields):
+        references = self.references.get(database, dict())
+        for field in fields.values():
+            if not isinstance(field.key, ForeignKey):
+                continue
+
+            columns = references.get(field.key.table, dict())
+            users = columns.get(field.key.column, set())
+            users.discard((table, field.name))
+
+            #  Пустые записи не копим: таблицы создаются и удаляются тысячами
+            if not users:
+                columns.pop(field.key.column, None)
+            if not columns:
+                references.pop(field.key.table, None)
+
+    def index_references(self):
+        """
+            Построить обратный индекс ключей заново по всей схеме.
+        """
+        self.references = {database: dict() for database in self.databases}
+        for database, tables in self.databases.items():
+            for table, fields in tables.items():
+                self.add_references(database, table, fields)
     
     def use(self, dbname):
-        self.cursor = dbname.value
+        self.cursor = dbname
 
-    def show(self, tok):
-        val = tok.value.lower()
+    def show(self, val):
 
         if val == "databases":
-            print("Existing databases:")
+            print("Existing databases:", file=self.output)
             for db in self.databases:
                 ln = len(self.databases[db])
-                print(db, f"{ln} table{("s","")[ln == 1]}{("", '\t'+"<--")[self.cursor == db]}")
+                print(db, f"{ln} table{("s","")[ln == 1]}{("", '\t'+"<--")[self.cursor == db]}", file=self.output)
 
         elif val == "tables":
-            print(f"Tables of {self.cursor} database:")
+            print(f"Tables of {self.cursor} database:", file=self.output)
             for table in self.databases[self.cursor]:
-                print(table, self.databases[self.cursor][table])
-
-    def create(self, entity, exists, name, struct=None):
+                print(table, self.databases[self.cursor][table], file=self.output)
 
-        entity_str = entity.value.lower()
+    def create(self, command:CreateDatabase | CreateTable):
 
+        exists = command.exists
         if exists:
             raise ValueError("IF EXISTS всегда ведет к ошибке")
 
-        name_str = name.value
-        if entity_str == "database":
+        name_str = command.name
+        if isinstance(command, CreateDatabase):
 
             if name_str in self.databases:
                 if exists is None:
@@ -143,107 +480,38 @@ class OurSQLInterpreter:
                 else:
                     return
             
+            name_str = sys.intern(name_str)
             self.databases[name_str] = dict()
+            self.references[name_str] = dict()
 
-        elif entity_str == "table":
+        else:
             if name_str in self.databases[self.cursor]:
                 if exists is None:
                     raise ValueError(f"Table \"{name_str}\" already exists in {self.cursor}.")
                 else:
                     return
                 
-            self.databases[self.cursor][name_str] = self.create_table(struct)
-            
-        else:
-            raise ValueError(f"Invalid entity \"{entity_str}\"")
-        
-    def create_key(self, tree):
-
-        key_type = tree.data.value.lower()
-        
-        if key_type == "primary_key" or key_type == "set_primary":
-            return PrimaryKey()
-        elif key_type == "foreign_key" or  key_type == "set_foreign":
-            if key_type == "set_foreign":
-                args = tree.children[1:]
-            else:
-                args = tree.children
-            kwargs = dict()
-
-            for arg in args[2:]:
-                option, action = map(lambda tok: tok.value.lower(), arg.children)
-                if option in kwargs:
-                    raise ValueError(f"Duplicate options {option}")
-                else:
-                    kwargs[option] = action
-
-            return ForeignKey(args[0], args[1], **kwargs)
-        else:
-            raise ValueError(f"Unknown key type: \"{key_type}\"")
-
-    def create_table(self, struct) -> dict:
-        new_table = dict()
-
-        for var_def in struct.children:
-            var_def_name = var_def.data.value.lower()
-
-            if var_def_name.split("_")[0] == "set":
-
-                target_col = var_def.children[0].value
-                if target_col not in new_table:
-                    raise ValueError(f"Column {target_col} is not defined.")
-
-                col = new_table[target_col]
-
-                if col.key is not None:
-                    raise ValueError(f"{target_col} is already a {col.key.__class__.__name__}.")
-
-                
-                new_table[target_col].key = self.create_key(var_def)
-
-            else:
-                schema = var_def.children
-
-                name = schema[0]
-                if name.value in new_table:
-                    raise ValueError(f"Column {name} is already defined.")
-
-
-                datatype = schema[1].lower()
-
-                kwargs = {
-                    "name": name,
-                    "dtype": datatype,
-                    "default": None,
-                    "null": True,
-                    "key": None
-                }
-
-                visited_attrs = set()
-    
-                for optional_attr in schema[2:]:
-
-                    attr_name = optional_attr.data.lower()
-
-                    if attr_name in visited_attrs:
-                        raise ValueError(f"Дублирование атрибутов")
-                    else:
-                        visited_attrs.add(attr_name)
-
-                    if attr_name == "foreign_key" or attr_name == "primary_key":
-                        val = self.create_key(optional_attr)
-                    elif attr_name == "default":
-                        dtype = optional_attr.children[0].data.lower()
-                        val = optional_attr.children[0].children[0].value
-                        if dtype != kwargs['dtype']:
-                            raise ValueError(f"Value {val} doesnt match type {kwargs['dtype']}")
-
-                    else:
-                        val = optional_attr.data.value
-
-                    attr_name = attr_name.split("_")[1] if "_" in attr_name else attr_name
-                    kwargs[attr_name] = val
-
-                new_table[name.value] = (Field(**kwargs))
-
-        return new_table
+            name_str = sys.intern(name_str)
+            fields = self.create_table(command.columns)
+            self.databases[self.cursor][name_str] = fields
+            self.add_references(self.cursor, name_str, fields)
+
+    def create_key(self, key:KeyDef):
+        if key.kind == "primary":
+            return PRIMARY_KEY
+        return foreign_key(key.table, key.column, **dict(key.options))
+
+    def create_table(self, columns) -> dict:
+        #  Новые Field на каждое выполнение: команда из кеша общая.
+        #  Имена и типы интернируются - в широкой схеме они повторяются
+        #  из таблицы в таблицу, а из разбора каждый раз приходят новой строкой
+        return {
+            sys.intern(column.name): Field(
+                sys.intern(column.name),
+                sys.intern(column.dtype),
+                column.default,
+                column.null,
+                self.create_key(column.key) if column.key is not None else None
+            )
+            for column in columns
+        }
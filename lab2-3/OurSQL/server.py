@@ -0,0 +1,229 @@
+"""
+    Сервер OurSQL: python -m OurSQL.server [--unix PATH | --host H --port P] [--catalog DIR]
+
+    Протокол построчный: клиент шлет инструкции одной строкой (можно
+    несколько через ";"), на каждую строку сервер отвечает одной строкой
+    JSON: {"ok": true, "output": "..."} или {"ok": false, "error": "..."}.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from lark.exceptions import UnexpectedInput
+from .commands import Command, Show, Use
+from .parser import MAX_CACHED_TEXT, OurSQLInterpreter, compile_cached, compile_script
+
+
+#  Столько разобранных инструкций сервер помнит сам, без пула
+MAX_PREPARED = 4096
+
+#  Длиннее строку запроса не принимаем (дампы - через run_stream)
+MAX_REQUEST = 1 << 20
+
+
+class ReadWriteLock:
+    """
+        Блокировка читателей/писателя для asyncio: читателей сколько угодно,
+        писатель один и без читателей. Ждущий писатель не пропускает новых
+        читателей вперед, иначе поток SHOW мог бы держать DDL бесконечно.
+    """
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+
+    @asynccontextmanager
+    async def read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writing and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                self.condition.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writing and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def compile_statement(text:str, mode:str, fallback:str|None) -> tuple[Command, ...]:
+    """
+        Разбор в процессе пула. Исключения Lark не всегда переживают
+        pickle обратно, поэтому синтаксическая ошибка уходит как ValueError.
+        Кешируется, как и в OurSQLInterpreter.compile, только короткий текст.
+    """
+    text = text.strip()
+    try:
+        if len(text) > MAX_CACHED_TEXT:
+            return compile_script(text, mode, fallback)
+        return compile_cached(text, mode, fallback)
+    except UnexpectedInput as error:
+        raise ValueError(str(error)) from None
+
+
+def parse_pool(workers:int|None=None) -> ProcessPoolExecutor:
+    """
+        Пул для разбора. Процессы запускаются через spawn, а не fork:
+        пул дозапускает их по мере надобности, и при fork они унаследовали
+        бы сокеты уже открытых соединений - закрытие на стороне сервера
+        тогда не доходило бы до клиента.
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_commands(session:OurSQLInterpreter, commands:tuple[Command, ...]) -> str:
+    session.output = io.StringIO()
+    try:
+        for command in commands:
+            session.execute(command)
+        return session.output.getvalue()
+    finally:
+        session.output = None
+
+
+class OurSQLServer:
+    """
+        Много клиентов над одним интерпретатором. У каждого соединения своя
+        сессия (OurSQLInterpreter.session) со своим USE.
+
+        Разбор идет в пуле процессов (parse_executor): Earley на длинной
+        инструкции занимает процессор надолго и не должен останавливать
+        цикл событий. Выполнение - в потоке под ReadWriteLock: SHOW и USE
+        читают схему вместе, CREATE/DROP/ALTER меняют ее по одному. В потоке,
+        а не в цикле, потому что запись в каталог и снимок - это диск.
+    """
+
+    def __init__(self, interpreter:OurSQLInterpreter|None=None, parse_executor:Executor|None=None):
+        self.interpreter = interpreter if interpreter is not None else OurSQLInterpreter()
+        self.parse_executor = parse_executor if parse_executor is not None else parse_pool()
+        self.lock = ReadWriteLock()
+
+        #  Разобранные инструкции по тексту, старейшие вытесняются первыми
+        ## {текст: команды}
+        self.prepared = dict()
+
+        self.sessions = 0
+        self.statements = 0
+
+    async def execute(self, session:OurSQLInterpreter, text:str) -> str:
+        loop = asyncio.get_running_loop()
+
+        #  Уже разобранный текст в пул не отправляем: дорога туда и обратно
+        #  стоит дороже самого разбора короткой инструкции. Длинный текст
+        #  (до MAX_REQUEST) не кешируем - иначе память сервера без предела
+        cacheable = session.cache and len(text) <= MAX_CACHED_TEXT
+
+        commands = self.prepared.get(text) if cacheable else None
+        if commands is None:
+            commands = await loop.run_in_executor(
+                self.parse_executor, compile_statement, text, session.mode, session.fallback_mode
+            )
+            if cacheable:
+                if len(self.prepared) >= MAX_PREPARED:
+                    self.prepared.pop(next(iter(self.prepared)))
+                self.prepared[text] = commands
+
+        readonly = all(isinstance(command, (Show, Use)) for command in commands)
+        async with (self.lock.read() if readonly else self.lock.write()):
+            output = await loop.run_in_executor(None, run_commands, session, commands)
+
+        self.statements += 1
+        return output
+
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        session = self.interpreter.session()
+        self.sessions += 1
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+
+                try:
+                    #  Битый UTF-8 - ошибка этого запроса, а не повод рвать соединение
+                    text = line.decode("utf-8").strip()
+                    reply = {"ok": True, "output": await self.execute(session, text)}
+                except Exception as error:
+                    reply = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            #  Клиент ушел или прислал строку длиннее MAX_REQUEST
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host:str|None=None, port:int|None=None, unix:str|None=None) -> asyncio.Server:
+        if unix is not None:
+            return await asyncio.start_unix_server(self.handle, unix, limit=MAX_REQUEST)
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST)
+
+    def close(self):
+        self.parse_executor.shutdown(cancel_futures=True)
+        self.interpreter.close()
+
+
+async def serve(args) -> None:
+    interpreter = OurSQLInterpreter(args.mode, catalog=args.catalog)
+    executor = parse_pool(args.workers) if args.workers else None
+    server = OurSQLServer(interpreter, executor)
+
+    try:
+        listener = await server.start(args.host, args.port, args.unix)
+        where = args.unix or ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+        #  Первая строка вывода - знак, что можно подключаться (см. bench_server)
+        print(f"OurSQL listening on {where}", flush=True)
+
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m OurSQL.server", description="Сервер OurSQL")
+    parser.add_argument("--unix", help="путь к unix-сокету (вместо TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5433)
+    parser.add_argument("--catalog", help="каталог на диске, см. Catalog")
+    parser.add_argument("--mode", default="lalr", help="парсер: lalr или earley")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="процессов для разбора")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import re
+from typing import Iterable, Iterator, NamedTuple
+
+
+#  Конец инструкции или начало строкового литерала ('...' или "...")
+SPECIAL = re.compile(r"""[;'"]""")
+
+
+class StatementReport(NamedTuple):
+    """
+        Итог одной инструкции потокового выполнения.
+
+        number - номер инструкции с 1, line - строка, с которой она
+        начинается, consumed - сколько символов входа прочитано к ее концу.
+    """
+    number       : int
+    line         : int
+    consumed     : int
+    parse_seconds: float
+    run_seconds  : float
+
+
+def read_chunks(source, chunk_size:int=1 << 16, encoding:str="utf-8") -> Iterator[str]:
+    """
+        Путь к файлу, открытый текстовый файл или итерируемое из кусков текста -> куски.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding=encoding, newline="") as file:
+            yield from iter(lambda: file.read(chunk_size), "")
+
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(chunk_size), "")
+
+    else:
+        yield from source
+
+
+def split_statements(chunks:Iterable[str]) -> Iterator[tuple[int, int, str]]:
+    """
+        Куски текста -> (строка начала, прочитано символов, инструкция с ";").
+
+        ";" внутри строкового литерала инструкцию не завершает. Куски могут
+        резаться где угодно, в памяти держится только текущая инструкция.
+        Непустой хвост без ";" тоже отдается - пусть парсер скажет, что не так.
+    """
+    ## [куски текущей инструкции]
+    pending = []
+    quote = None
+    line = 1
+    consumed = 0
+
+    for chunk in chunks:
+        #  Начало еще не отданной части куска и позиция поиска
+        begin = pos = 0
+
+        while True:
+            if quote is not None:
+                end = chunk.find(quote, pos)
+                if end == -1:
+                    break
+                quote = None
+                pos = end + 1
+                continue
+
+            match = SPECIAL.search(chunk, pos)
+            if match is None:
+                break
+
+            if match.group() != ";":
+                quote = match.group()
+                pos = match.end()
+                continue
+
+            pending.append(chunk[begin:match.end()])
+            begin = pos = match.end()
+
+            text = "".join(pending)
+            pending.clear()
+            consumed += len(text)
+
+            start = line + text[:len(text) - len(text.lstrip())].count("\n")
+            line += text.count("\n")
+            yield start, consumed, text
+
+        pending.append(chunk[begin:])
+
+    text = "".join(pending)
+    if text.strip():
+        start = line + text[:len(text) - len(text.lstrip())].count("\n")
+        yield start, consumed + len(text), text